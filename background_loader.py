@@ -0,0 +1,72 @@
+import queue, threading
+
+# Runs a chunk generator (journal.iter_load / sqlite_store.iter_load) on a
+# worker thread and feeds the chunks to the Tk thread one per after() tick,
+# so the window stays responsive and fills in while the book loads.
+
+POLL_MS = 15
+
+class BackgroundLoader:
+    def __init__(self, widget, chunks, on_chunk, on_done=None):
+        self.widget = widget
+        self.on_chunk = on_chunk
+        self.on_done = on_done
+        self.queue = queue.Queue()
+        self.cancelled = False
+        threading.Thread(target=self.work, args=(chunks,), daemon=True).start()
+        self.widget.after(0, self.poll)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def work(self, chunks):
+        try:
+            for item in chunks:
+                if self.cancelled:
+                    return
+                self.queue.put(item)
+        except Exception as e:
+            self.queue.put(("error", e, 1.0))
+        self.queue.put(None)
+
+    def poll(self):
+        if self.cancelled:
+            return
+        try:
+            item = self.queue.get_nowait()
+        except queue.Empty:
+            self.widget.after(POLL_MS, self.poll)
+            return
+        if item is None:
+            if self.on_done:
+                self.on_done()
+            return
+        if item[0] == "error":
+            self.cancelled = True
+            if self.on_done:
+                self.on_done(item[1])
+            return
+        self.on_chunk(*item)
+        # hand control back to Tk between chunks so it can redraw
+        self.widget.after(1, self.poll)
+
+def run_in_background(widget, work, on_done):
+    # one blocking call on a worker thread; on_done(result, error) runs on the Tk thread
+    results = queue.Queue()
+
+    def run():
+        try:
+            results.put((work(), None))
+        except Exception as e:
+            results.put((None, e))
+
+    def poll():
+        try:
+            result, error = results.get_nowait()
+        except queue.Empty:
+            widget.after(POLL_MS, poll)
+            return
+        on_done(result, error)
+
+    threading.Thread(target=run, daemon=True).start()
+    widget.after(POLL_MS, poll)
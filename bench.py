@@ -0,0 +1,327 @@
+import json, os, platform, random, shutil, statistics, subprocess, sys, tempfile, time
+import journal, tree_patch
+from contact_store import ContactStore
+from search_session import SearchSession
+from virtual_tree import VirtualTree
+
+# Benchmarks for the operations behind final.py's buttons, on generated
+# books from 1k to 1M contacts. Each result is one JSON line, tagged with
+# the commit it ran on, so runs from two commits can be compared:
+#
+#   python bench.py [--sizes 1000,10000,100000] [--storage journal,json,sqlite]
+#                   [--runs 5] [--seed 0] [--out results.ndjson]
+#   python bench.py --compare before.ndjson after.ndjson
+#
+#   load          store.open() + load(), as load_contacts()
+#   stream_load   iter_load() chunks fed to load_chunk(), as start_loading()
+#   save          store.save(), as save_contacts()
+#   duplicate     has_phone() on a known or new phone, the check in add_contact() (per call)
+#   add           add() of a new contact, check and write included (per call)
+#   search:TERM   store.search(), as search_contact() with sqlite
+#   typing        a name typed one letter at a time through SearchSession, as the search box
+#   filter:STATUS store.filter(), as show_favourites() / show_blocked()
+#   refresh       refresh_table() on a VirtualTree
+#   patch         refresh_table() without VIRTUAL, after one contact changed
+#   patch_fill    refresh_table() without VIRTUAL into an empty tree (books up to PATCH_FILL_MAX)
+#
+# The Treeview is a headless stand-in (HeadlessTree) that counts the Tk
+# calls it would have made and the sibling links those calls would have
+# followed; refresh and patch results carry them as tk_calls and tk_walk.
+
+SIZES = (1000, 10000, 100000)
+STORAGES = ("journal", "json", "sqlite")
+RUNS = 5
+LEGACY = 0.05        # share of contacts saved the way why.py used to: favourite/blocked flags
+PATCH_FILL_MAX = 100000
+PROBES = 1000        # calls timed for the per-call benchmarks
+SEARCH_TERMS = ("an", "priya", "555", "@gmail", "zzqx")
+
+FIRST = ("Aarav", "Priya", "Rohan", "Ananya", "Sushant", "Shreya", "Vivaan", "Diya", "Arjun", "Isha",
+         "John", "Maria", "Wei", "Fatima", "Liam", "Olivia", "Noah", "Emma", "Mateo", "Sofia",
+         "Yuki", "Omar", "Chloe", "Lucas", "Amara", "Ethan", "Zara", "Kabir", "Meera", "Dev")
+LAST = ("Chaudhary", "Sharma", "Patel", "Singh", "Gupta", "Khan", "Smith", "Garcia", "Chen", "Kim",
+        "Nguyen", "Müller", "Rossi", "Silva", "Ahmed", "Tanaka", "Brown", "Lopez", "Das", "Iyer")
+DOMAINS = ("gmail.com", "yahoo.com", "outlook.com", "example.org", "company.np")
+
+# --------- Books ---------
+def generate(n, seed=0, legacy=LEGACY):
+    # n contacts with unique 10-digit phones; most have an email, a few are
+    # favourites or blocked, and `legacy` of them use the old flag fields
+    rng = random.Random(seed)
+    phones = rng.sample(range(9000000000, 10000000000), n)
+    contacts = []
+    for phone in phones:
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        email = f"{first}.{last}{rng.randrange(100)}@{rng.choice(DOMAINS)}".lower() if rng.random() < 0.7 else ""
+        status = rng.choices(("normal", "favourite", "blocked"), (85, 10, 5))[0]
+        contact = {"name": f"{first} {last}", "phone": str(phone), "email": email}
+        if rng.random() < legacy:
+            contact["favourite"] = status == "favourite"
+            contact["blocked"] = status == "blocked"
+        else:
+            contact["status"] = status
+        contacts.append(contact)
+    return contacts
+
+def row_values(contact):
+    # the same columns final.py shows
+    emoji = {"favourite": "⭐", "blocked": "🚫"}.get(contact.status, "🙂")
+    return (contact.name, contact.phone, contact.email, emoji)
+
+# --------- Headless Treeview ---------
+class HeadlessTree:
+    # the parts of ttk.Treeview that VirtualTree and tree_patch use, in
+    # plain Python; every method that would be a Tk call bumps `calls`.
+    # Tk keeps an item's children in a linked list: `index` walks back
+    # over the siblings before the item, and an insert or move at a
+    # numeric index walks forward to it ("end" goes straight to the last
+    # child). Those walks are done here too, over `order`, and counted in
+    # `walked`, so they show up in both the timings and the results.
+    def __init__(self):
+        self.calls = 0
+        self.walked = 0       # sibling steps Tk would have taken
+        self.order = []       # item ids in display order
+        self.values = {}
+        self.next_id = 0
+        self.selected = ()
+
+    def walk(self, steps):
+        # a scan over `steps` items costs what following that many links does
+        if steps:
+            self.order.index(self.order[steps - 1])
+        self.walked += steps
+
+    def place(self, iid, index):
+        if index == "end" or index >= len(self.order):
+            self.order.append(iid)
+            return
+        self.walk(index)
+        self.order.insert(index, iid)
+
+    def insert(self, parent, index, iid=None, values=()):
+        self.calls += 1
+        if iid is None:
+            self.next_id += 1
+            iid = f"I{self.next_id}"
+        self.place(iid, index)
+        self.values[iid] = values
+        return iid
+
+    def delete(self, *items):
+        self.calls += 1
+        gone = set(items)
+        self.order = [iid for iid in self.order if iid not in gone]
+        for iid in items:
+            del self.values[iid]
+
+    def detach(self, *items):
+        self.calls += 1
+        gone = set(items)
+        self.order = [iid for iid in self.order if iid not in gone]
+
+    def move(self, item, parent, index):
+        self.calls += 1
+        if item in self.order:
+            self.order.remove(item)
+        self.place(item, index)
+
+    def index(self, item):
+        self.calls += 1
+        position = self.order.index(item)   # the walk back to the first sibling
+        self.walked += position
+        return position
+
+    def item(self, item, values=None):
+        self.calls += 1
+        if values is not None:
+            self.values[item] = values
+        return {"values": self.values[item]}
+
+    def get_children(self, item=""):
+        self.calls += 1
+        return tuple(self.order)
+
+    def selection(self):
+        self.calls += 1
+        return self.selected
+
+    def selection_set(self, items):
+        self.calls += 1
+        self.selected = tuple(items)
+
+    def focus(self, item=None):
+        self.calls += 1
+        return ""
+
+    def yview_moveto(self, fraction):
+        self.calls += 1
+
+    def yview_scroll(self, number, what):
+        self.calls += 1
+
+    def bind(self, *args, **kw):
+        pass
+
+class HeadlessScrollbar:
+    def config(self, **kw):
+        pass
+
+    def set(self, first, last):
+        pass
+
+# --------- Timing ---------
+def timed(fn, runs, setup=None):
+    # seconds per run; setup() runs before each and is not timed
+    times = []
+    for _ in range(runs):
+        args = (setup(),) if setup is not None else ()
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return times
+
+def commit_id():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+    return (rev + "+dirty" if dirty else rev) or None
+
+class Recorder:
+    def __init__(self, out, runs):
+        self.out = out
+        self.runs = runs
+        self.meta = {"commit": commit_id(), "python": platform.python_version(), "machine": platform.machine(),
+                     "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    def emit(self, name, size, storage, times, per=1, **extra):
+        result = {"name": name, "size": size, "storage": storage,
+                  "seconds": statistics.median(times) / per, "min": min(times) / per,
+                  "runs": len(times), "per": per}
+        result.update(extra)
+        result.update(self.meta)
+        self.out.write(json.dumps(result) + "\n")
+        self.out.flush()
+        print(f"{name:16} {size:>8} {storage:8} {result['seconds'] * 1000:10.4g} ms", file=sys.stderr)
+
+# --------- Benchmarks ---------
+def bench_book(rec, contacts, storage, workdir):
+    size, runs = len(contacts), rec.runs
+    book = os.path.join(workdir, f"{storage}-{size}.json")
+    journal.save(book, contacts)
+
+    def fresh():
+        store = ContactStore(storage=storage)
+        store.open(book)
+        return store
+
+    fresh().load()   # sqlite: the first open() migrates the JSON file; keep that out of the timings
+    rec.emit("load", size, storage, timed(lambda s: s.load(), runs, setup=fresh))
+
+    def stream(store):
+        for kind, payload, _ in store.iter_load():
+            store.load_chunk(kind, payload)
+    rec.emit("stream_load", size, storage, timed(stream, runs, setup=fresh))
+
+    store = fresh()
+    store.load()
+    rec.emit("save", size, storage, timed(store.save, runs))
+
+    rng = random.Random(size)
+    known = [c["phone"] for c in rng.sample(contacts, min(PROBES // 2, size))]
+    probes = known + [str(rng.randrange(1000000000, 9000000000)) for _ in range(PROBES - len(known))]
+    rec.emit("duplicate", size, storage, timed(lambda: [store.has_phone(p) for p in probes], runs), per=len(probes))
+
+    adds = iter(range(1000000000, 9000000000, 7))
+    per = 100
+    rec.emit("add", size, storage, timed(lambda: [store.add("Bench Mark", str(next(adds))) for _ in range(per)], runs),
+             per=per)
+
+    for term in SEARCH_TERMS:
+        rec.emit(f"search:{term}", size, storage, timed(lambda: store.search(term), runs))
+    if storage != "sqlite":
+        name = "shreya chaudhary"
+
+        def typing():
+            session = SearchSession(store.index)
+            for i in range(1, len(name) + 1):
+                session.search(name[:i])
+        rec.emit("typing", size, storage, timed(typing, runs), per=len(name))
+    for status in ("favourite", "blocked"):
+        rec.emit(f"filter:{status}", size, storage, timed(lambda: store.filter(status), runs))
+
+    tree = HeadlessTree()
+    virtual = VirtualTree(None, HeadlessScrollbar(), row_values, tree=tree)
+    virtual.visible = 30
+    virtual.set_rows(store.items())
+    tree.calls = tree.walked = 0
+    rec.emit("refresh", size, storage, timed(lambda: virtual.set_rows(store.items()), runs),
+             tk_calls=tree.calls // runs, tk_walk=tree.walked // runs)
+
+    if size <= PATCH_FILL_MAX:
+        def fill():
+            tree = HeadlessTree()
+            tree_patch.patch(tree, {}, [(iid, row_values(c)) for iid, c in store.items()])
+            return tree
+        trees = []
+        rec.emit("patch_fill", size, storage, timed(lambda: trees.append(fill()), runs),
+                 tk_calls=trees[-1].calls, tk_walk=trees[-1].walked)
+        tree = HeadlessTree()
+        shown = tree_patch.patch(tree, {}, [(iid, row_values(c)) for iid, c in store.items()])
+        toggled = store.items()[size // 2][0]
+
+        def change():
+            store.toggle_status([toggled], "favourite")
+            tree.calls = tree.walked = 0
+
+        def patch(_):
+            nonlocal shown
+            shown = tree_patch.patch(tree, shown, [(iid, row_values(c)) for iid, c in store.items()])
+        rec.emit("patch", size, storage, timed(patch, runs, setup=change), tk_calls=tree.calls, tk_walk=tree.walked)
+    store.close()
+
+def run(sizes=SIZES, storages=STORAGES, runs=RUNS, seed=0, out=sys.stdout):
+    rec = Recorder(out, runs)
+    workdir = tempfile.mkdtemp(prefix="contact-bench-")
+    try:
+        for size in sizes:
+            contacts = generate(size, seed)
+            for storage in storages:
+                bench_book(rec, contacts, storage, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+# --------- Comparing ---------
+def read_results(path):
+    with open(path, "r") as f:
+        return {(r["name"], r["size"], r["storage"]): r for r in map(json.loads, f) if r}
+
+def compare(before, after):
+    old, new = read_results(before), read_results(after)
+    rows = []
+    for key in sorted(set(old) & set(new), key=lambda k: (k[2], k[1], k[0])):
+        ratio = new[key]["seconds"] / old[key]["seconds"] if old[key]["seconds"] else float("inf")
+        rows.append((key, old[key]["seconds"], new[key]["seconds"], ratio))
+    return rows
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["--compare"]:
+        if len(args) != 3:
+            sys.exit("usage: python bench.py --compare BEFORE.ndjson AFTER.ndjson")
+        for (name, size, storage), old, new, ratio in compare(args[1], args[2]):
+            print(f"{name:16} {size:>8} {storage:8} {old * 1000:10.4g} -> {new * 1000:10.4g} ms  x{ratio:.2f}")
+        sys.exit(0)
+    options = dict(zip(args[::2], args[1::2]))
+    sizes = [int(s) for s in options.get("--sizes", ",".join(map(str, SIZES))).split(",")]
+    storages = options.get("--storage", ",".join(STORAGES)).split(",")
+    out_path = options.get("--out")
+    out = open(out_path, "w") if out_path else sys.stdout
+    try:
+        run(sizes, storages, int(options.get("--runs", RUNS)), int(options.get("--seed", 0)), out)
+    finally:
+        if out_path:
+            out.close()
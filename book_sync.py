@@ -0,0 +1,241 @@
+import hashlib, json, os, subprocess, sys
+import journal
+from contact_store import ContactStore, ContactError
+
+# Two-way sync of two copies of a book (say sushant.json on two machines)
+# that sends only hashes until it knows which contacts differ.
+#
+# Every contact gets a hash of its fields. Contacts are bucketed by the
+# first DEPTH hex digits of a hash of their phone, and each prefix
+# ("", "3", "3f", "3fa") gets a hash of its children: a Merkle tree with
+# 16-way fan-out. The two sides compare the root, then the children of
+# every prefix that differs, one level per round trip, and finally the
+# (phone, hash) pairs of the buckets that differ. Only contacts found that
+# way are sent, each way, and merged with one batch commit per side.
+#
+# There is no history, so a contact one side lacks is copied to it (never
+# deleted), and a phone with different details on each side keeps one
+# version on both: ours by default, theirs with --prefer theirs. A changed
+# phone number shows up as two contacts.
+#
+#   python book_sync.py BOOK --with OTHER_BOOK     other book through a local pipe
+#   python book_sync.py BOOK --remote "CMD"        CMD runs `book_sync.py --serve BOOK`
+#                                                  elsewhere, e.g. over ssh
+#   python book_sync.py --serve BOOK               answer on stdin/stdout
+#
+# Without a live connection, through files (one direction at a time):
+#
+#   python book_sync.py --summary BOOK > book.sum          hashes only
+#   python book_sync.py --delta OTHER book.sum > other.delta   contacts book lacks or has differently
+#   python book_sync.py --apply BOOK other.delta
+#
+# Add --storage json|sqlite for books not kept in journal storage.
+
+DEPTH = 3
+FIELDS = ("name", "phone", "email", "status")
+
+def record_hash(contact):
+    c = journal.normalize(contact)
+    text = "\0".join(c[f] for f in FIELDS)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+def bucket_of(phone):
+    return hashlib.sha1(phone.encode("utf-8")).hexdigest()[:DEPTH]
+
+class Summary:
+    # the hash tree of one book
+    def __init__(self, contacts):
+        self.buckets = {}   # prefix of DEPTH digits -> {phone: record hash}
+        for c in contacts:
+            c = c.to_dict() if hasattr(c, "to_dict") else c
+            self.buckets.setdefault(bucket_of(c["phone"]), {})[c["phone"]] = record_hash(c)
+        self.nodes = {}     # prefix -> hash, for every prefix with contacts under it
+        level = {}
+        for prefix, records in self.buckets.items():
+            level[prefix] = hashlib.sha1("".join(p + h for p, h in sorted(records.items())).encode("utf-8")).hexdigest()
+        self.nodes.update(level)
+        for depth in range(DEPTH - 1, -1, -1):
+            parents = {}
+            for prefix in sorted(level):
+                parents.setdefault(prefix[:depth], []).append(prefix[depth] + level[prefix])
+            level = {p: hashlib.sha1("".join(kids).encode("utf-8")).hexdigest() for p, kids in parents.items()}
+            self.nodes.update(level)
+
+    def root(self):
+        return self.nodes.get("", "")
+
+    def children(self, prefixes):
+        return {p + d: self.nodes[p + d] for p in prefixes for d in "0123456789abcdef" if p + d in self.nodes}
+
+    def records(self, prefixes):
+        found = {}
+        for p in prefixes:
+            found.update(self.buckets.get(p, {}))
+        return found
+
+    def all_records(self):
+        return self.records(self.buckets)
+
+# --------- Applying ---------
+def merge_into(store, contacts):
+    # add or overwrite by phone, as one batch (one disk write)
+    ops = []
+    for c in contacts:
+        c = journal.normalize(c)
+        iid = store.index.find_phone(c["phone"])
+        if iid is None:
+            ops.append(("add", (c["name"], c["phone"], c["email"], c["status"])))
+        else:
+            ops.append(("edit", (iid, c["name"], c["phone"], c["email"])))
+            ops.append(("set_status", ([iid], c["status"])))
+    if ops:
+        store.commit(ops)
+    return len(contacts)
+
+def contacts_for(store, phones):
+    found = []
+    for phone in phones:
+        iid = store.index.find_phone(phone)
+        if iid is not None:
+            found.append(store.get(iid).to_dict())
+    return found
+
+def open_book(path, storage):
+    store = ContactStore(storage=storage)
+    store.open(path)
+    store.load()
+    return store
+
+# --------- Live sync ---------
+class Book:
+    # one side of a sync, answering the requests the other side sends
+    def __init__(self, store):
+        self.store = store
+        self.summary = Summary(store)
+
+    def answer(self, request):
+        op = request.get("op")
+        if op == "root":
+            return {"hash": self.summary.root()}
+        if op == "children":
+            return {"nodes": self.summary.children(request["prefixes"])}
+        if op == "records":
+            return {"records": self.summary.records(request["prefixes"])}
+        if op == "get":
+            return {"contacts": contacts_for(self.store, request["phones"])}
+        if op == "put":
+            return {"merged": merge_into(self.store, request["contacts"])}
+        return {"error": f"Unknown op: {op}"}
+
+class Pipe:
+    # the other side as a child process speaking NDJSON on stdin/stdout
+    def __init__(self, command):
+        self.proc = subprocess.Popen(command, shell=isinstance(command, str), stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE, text=True, encoding="utf-8")
+
+    def answer(self, request):
+        self.proc.stdin.write(json.dumps(request) + "\n")
+        self.proc.stdin.flush()
+        line = self.proc.stdout.readline()
+        if not line:
+            raise OSError("the other side hung up")
+        reply = json.loads(line)
+        if "error" in reply:
+            raise OSError(reply["error"])
+        return reply
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait()
+
+def sync(store, other, prefer="mine"):
+    # make both books hold the same contacts; `other` answers like Book
+    stats = {"round_trips": 0, "hashes": 0, "sent": 0, "received": 0}
+
+    def ask(**request):
+        stats["round_trips"] += 1
+        return other.answer(request)
+
+    mine = Summary(store)
+    if ask(op="root")["hash"] == mine.root():
+        return stats
+    prefixes = [""]
+    for depth in range(DEPTH):
+        theirs = ask(op="children", prefixes=prefixes)["nodes"]
+        ours = mine.children(prefixes)
+        stats["hashes"] += len(theirs)
+        prefixes = sorted(p for p in set(theirs) | set(ours) if theirs.get(p) != ours.get(p))
+        if not prefixes:
+            return stats
+    theirs = ask(op="records", prefixes=prefixes)["records"]
+    ours = mine.records(prefixes)
+    stats["hashes"] += len(theirs)
+
+    differ = [p for p in theirs if p in ours and theirs[p] != ours[p]]
+    fetch = [p for p in theirs if p not in ours] + (differ if prefer == "theirs" else [])
+    send = [p for p in ours if p not in theirs] + (differ if prefer == "mine" else [])
+    if fetch:
+        stats["received"] = merge_into(store, ask(op="get", phones=fetch)["contacts"])
+    if send:
+        ask(op="put", contacts=contacts_for(store, send))
+        stats["sent"] = len(send)
+    return stats
+
+def serve(store, infile=sys.stdin, outfile=sys.stdout):
+    book = Book(store)
+    for line in infile:
+        if not line.strip():
+            continue
+        try:
+            reply = book.answer(json.loads(line))
+        except (ContactError, ValueError, KeyError) as e:
+            reply = {"error": str(e)}
+        outfile.write(json.dumps(reply) + "\n")
+        outfile.flush()
+
+# --------- Through files ---------
+def summary_file(store, out):
+    json.dump({"records": Summary(store).all_records()}, out)
+
+def delta(store, summary):
+    # our contacts that the book behind `summary` lacks or has differently
+    theirs = summary["records"]
+    return [c.to_dict() for c in store if theirs.get(c.phone) != record_hash(c)]
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    flags = {}
+    for name in ("--with", "--remote", "--storage", "--prefer"):
+        if name in args:
+            i = args.index(name)
+            flags[name] = args[i + 1]
+            del args[i:i + 2]
+    storage = flags.get("--storage", "journal")
+    usage = "usage: python book_sync.py BOOK (--with OTHER | --remote CMD) [--prefer mine|theirs] " \
+            "| --serve BOOK | --summary BOOK | --delta BOOK SUMMARY | --apply BOOK DELTA"
+    if not args or flags.get("--prefer", "mine") not in ("mine", "theirs"):
+        sys.exit(usage)
+    if args[0] == "--serve":
+        serve(open_book(args[1], storage))
+    elif args[0] == "--summary":
+        summary_file(open_book(args[1], storage), sys.stdout)
+    elif args[0] == "--delta":
+        with open(args[2], "r") as f:
+            json.dump(delta(open_book(args[1], storage), json.load(f)), sys.stdout)
+    elif args[0] == "--apply":
+        with open(args[2], "r") as f:
+            print(f"merged {merge_into(open_book(args[1], storage), json.load(f))} contacts")
+    elif "--with" in flags or "--remote" in flags:
+        if "--with" in flags:
+            command = [sys.executable, os.path.abspath(__file__), "--serve", flags["--with"], "--storage", storage]
+        else:
+            command = flags["--remote"]
+        other = Pipe(command)
+        try:
+            stats = sync(open_book(args[0], storage), other, flags.get("--prefer", "mine"))
+        finally:
+            other.close()
+        print(f"sent {stats['sent']}, received {stats['received']} contacts "
+              f"({stats['hashes']} hashes, {stats['round_trips']} round trips)")
+    else:
+        sys.exit(usage)
@@ -0,0 +1,209 @@
+import json, sys
+import data_dir
+from contact_store import ContactStore, ContactError, STATUSES
+
+# Scriptable access to a book without a window, for cron jobs and
+# pipelines. Reads one JSON op per line on stdin and writes one JSON result
+# per line on stdout, in the same order:
+#
+#   {"op": "add", "name": "Ann", "phone": "555", "email": "", "status": "normal"}
+#   {"op": "edit", "phone": "555", "contact": {"name": "Ann B", "phone": "556"}}
+#   {"op": "delete", "phone": "556"}
+#   {"op": "status", "phone": "555", "status": "favourite"}   (or "set-status")
+#   {"op": "search", "q": "ann", "status": "", "limit": 100}
+#
+# These are the journal's own ops (an add may also carry its fields under
+# "contact"; an edit only needs the fields that change), so a .json.log can
+# be piped straight through; its {"op": "batch", "ops": [...]} lines give
+# one result per op they hold. Results look like
+#
+#   {"line": 1, "ok": true, "contact": {...}}
+#   {"line": 4, "ok": false, "error": "Contact not found!"}
+#   {"line": 5, "ok": true, "total": 1, "contacts": [...]}
+#
+# Changes are queued and committed BATCH at a time with
+# ContactStore.commit(), so a large stream costs one write per batch, not
+# one per line. A search, or an op on a phone the queued batch already
+# touches, commits the queue first so it sees every line before it. If a
+# batch is refused, its ops are retried one by one so each failing line
+# gets its own error. Write results come out when their batch commits; use
+# --batch 1 to get each one straight away.
+#
+#   python cli.py (--user NAME | --book PATH) [--storage journal] [--batch 1000] < ops.ndjson
+
+BATCH = 1000
+STORAGE = "journal"
+PAGE = 100
+TEXT_FIELDS = ("name", "phone", "email", "status", "q")
+USAGE = "usage: python cli.py (--user NAME | --book PATH) [--storage journal] [--batch 1000] < ops.ndjson"
+
+def check_types(op):
+    # a line's fields must be strings wherever the op keeps them
+    fields = op.get("contact", {})
+    if not isinstance(fields, dict):
+        raise ContactError("contact must be a JSON object")
+    for where in (op, fields):
+        for f in TEXT_FIELDS:
+            if f in where and not isinstance(where[f], str):
+                raise ContactError(f"{f} must be a string")
+
+class Runner:
+    def __init__(self, store, out, batch=BATCH):
+        self.store = store
+        self.out = out
+        self.size = batch
+        self.queue = []      # (line, batch op, phone) waiting for commit
+        self.touched = set()
+        self.errors = 0
+
+    def emit(self, result):
+        self.out.write(json.dumps(result) + "\n")
+        if not result["ok"]:
+            self.errors += 1
+
+    # --------- Input ---------
+    def run(self, lines):
+        for n, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                op = json.loads(line)
+                if not isinstance(op, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                self.flush()
+                self.emit({"line": n, "ok": False, "error": f"Bad JSON: {e}"})
+                continue
+            try:
+                self.handle(n, op)
+            except ContactError as e:
+                self.flush()
+                self.emit({"line": n, "ok": False, "error": str(e)})
+        self.flush()
+        return self.errors
+
+    def handle(self, n, op):
+        check_types(op)
+        kind = op.get("op")
+        if kind == "batch":
+            return self.expand(n, op.get("ops"))
+        if kind == "search":
+            self.flush()
+            return self.search(n, op)
+        if kind == "add":
+            fields = op.get("contact", op)
+            phone = fields.get("phone", "")
+            status = fields.get("status") or "normal"
+            if status not in STATUSES:
+                raise ContactError(f"Unknown status: {status}")
+            self.queue_op(n, [phone], ("add", (fields.get("name", ""), phone, fields.get("email", ""), status)), phone)
+            return
+        if kind not in ("edit", "delete", "status", "set-status"):
+            raise ContactError(f"Unknown op: {kind}")
+        phone = op.get("phone", "")
+        if phone in self.touched:
+            self.flush()   # it refers to the contact as the queued ops leave it
+        iid = self.store.index.find_phone(phone)
+        if iid is None:
+            raise ContactError("Contact not found!")
+        if kind == "edit":
+            old, fields = self.store.get(iid), op.get("contact", {})
+            new_phone = fields.get("phone", old.phone)
+            self.queue_op(n, [phone, new_phone], ("edit", (iid, fields.get("name", old.name), new_phone,
+                                                            fields.get("email", old.email))), new_phone)
+        elif kind == "delete":
+            self.queue_op(n, [phone], ("delete", ([iid],)), phone)
+        else:
+            self.queue_op(n, [phone], ("set_status", ([iid], op.get("status"))), phone)
+
+    def expand(self, n, ops):
+        # a journal line holding several ops: each gets its own result, all
+        # tagged with the line they came from
+        if not isinstance(ops, list) or not all(isinstance(op, dict) for op in ops):
+            raise ContactError("ops must be a list of JSON objects")
+        for op in ops:
+            try:
+                self.handle(n, op)
+            except ContactError as e:
+                self.flush()
+                self.emit({"line": n, "ok": False, "error": str(e)})
+
+    def queue_op(self, n, phones, batch_op, report):
+        if self.touched.intersection(phones):
+            self.flush()
+        self.queue.append((n, batch_op, report))
+        self.touched.update(phones)
+        if len(self.queue) >= self.size:
+            self.flush()
+
+    # --------- Output ---------
+    def flush(self):
+        queue, self.queue = self.queue, []
+        self.touched = set()
+        if not queue:
+            return
+        failed = {}
+        try:
+            self.store.commit([op for _, op, _ in queue])
+        except ContactError:
+            # find the lines at fault: commit what can be, one op at a time
+            for n, op, _ in queue:
+                try:
+                    self.store.commit([op])
+                except ContactError as e:
+                    failed[n] = str(e)
+        for n, op, phone in queue:
+            if n in failed:
+                self.emit({"line": n, "ok": False, "error": failed[n]})
+            elif op[0] == "delete":
+                self.emit({"line": n, "ok": True, "deleted": phone})
+            else:
+                contact = self.store.get(self.store.index.find_phone(phone))
+                self.emit({"line": n, "ok": True, "contact": contact.to_dict()})
+        self.out.flush()
+
+    def search(self, n, op):
+        term, status = op.get("q", ""), op.get("status", "")
+        if status and status not in STATUSES:
+            raise ContactError(f"Unknown status: {status}")
+        try:
+            limit = max(0, int(op.get("limit", PAGE)))
+        except (TypeError, ValueError):
+            raise ContactError("limit must be a number")
+        if term:
+            rows = self.store.search(term.lower())
+            if status:
+                rows = [r for r in rows if r[1].status == status]
+        elif status:
+            rows = self.store.filter(status)
+        else:
+            rows = self.store.items()
+        self.emit({"line": n, "ok": True, "total": len(rows), "contacts": [c.to_dict() for _, c in rows[:limit]]})
+        self.out.flush()
+
+def main(args):
+    options = dict(zip(args[::2], args[1::2]))
+    try:
+        batch = int(options.get("--batch", BATCH))
+    except ValueError:
+        batch = 0
+    if batch < 1:
+        sys.exit("--batch must be a whole number, 1 or more\n" + USAGE)
+    if "--user" in options:
+        data_dir.migrate()
+        book = data_dir.user_book(options["--user"])
+    elif "--book" in options:
+        book = options["--book"]
+    else:
+        sys.exit(USAGE)
+    store = ContactStore(storage=options.get("--storage", STORAGE))
+    store.open(book)
+    store.load()
+    runner = Runner(store, sys.stdout, batch)
+    try:
+        return 1 if runner.run(sys.stdin) else 0
+    except BrokenPipeError:
+        return 1   # whoever read our output went away; what was committed stays
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,96 @@
+import itertools
+from trigram_index import TrigramIndex
+
+# In-memory contact book keyed by a stable record id. The id doubles as the
+# Treeview iid, so a selected row maps straight back to its record, and a
+# phone -> id map answers add_contact's duplicate check without a scan.
+# A trigram index over the same records serves search_contact.
+
+class ContactIndex:
+    def __init__(self, contacts=()):
+        self.by_id = {}
+        self.by_phone = {}
+        self.text = TrigramIndex()
+        self.version = 0  # bumped whenever searchable text changes
+        self._ids = itertools.count(1)
+        self.extend(contacts)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def items(self):
+        return self.by_id.items()
+
+    def rows(self):
+        return list(self.by_id.items())
+
+    def get(self, iid):
+        return self.by_id.get(iid)
+
+    def find_phone(self, phone):
+        return self.by_phone.get(phone)
+
+    def has_phone(self, phone):
+        return phone in self.by_phone
+
+    def add(self, contact):
+        iid = str(next(self._ids))
+        self.by_id[iid] = contact
+        self.by_phone[contact["phone"]] = iid
+        self.text.add(iid, contact)
+        self.version += 1
+        return iid
+
+    def extend(self, contacts):
+        for c in contacts:
+            self.add(c)
+
+    def replace(self, iid, contact):
+        old = self.by_id[iid]
+        if self.by_phone.get(old["phone"]) == iid:
+            del self.by_phone[old["phone"]]
+        self.by_id[iid] = contact
+        self.by_phone[contact["phone"]] = iid
+        self.text.update(iid, contact)
+        self.version += 1
+
+    def remove(self, iid):
+        contact = self.by_id.pop(iid, None)
+        if contact is not None and self.by_phone.get(contact["phone"]) == iid:
+            del self.by_phone[contact["phone"]]
+        self.text.remove(iid)
+        self.version += 1
+        return contact
+
+    def clear(self):
+        self.by_id.clear()
+        self.by_phone.clear()
+        self.text.clear()
+        self.version += 1
+
+    def candidates(self, term):
+        # ids that may match the lowercased term, in book order
+        found = self.text.candidates(term)
+        if found is None:
+            return list(self.by_id)
+        # ids are handed out in increasing order, so sorting them restores book order
+        return sorted(found, key=int)
+
+    def matches(self, iid, term):
+        return term in self.text.texts[iid]
+
+    def search(self, term):
+        term = term.lower()
+        if not term:
+            return self.rows()
+        texts = self.text.texts
+        return [(iid, self.by_id[iid]) for iid in self.candidates(term) if term in texts[iid]]
+
+    def with_status(self, status):
+        return [(iid, c) for iid, c in self.by_id.items() if c["status"] == status]
+
+    def to_list(self):
+        return list(self.by_id.values())
@@ -0,0 +1,611 @@
+import os, sys, threading
+from contextlib import contextmanager
+import journal, sqlite_store
+from write_behind import WriteBehind
+from contact_index import ContactIndex
+from contact_table import ContactTable
+from sorted_contacts import SortedContacts
+
+# Headless contact book: loading, saving, validation, mutations, search
+# and status filters, with no Tk involved. The GUIs keep only the widgets
+# and call into a ContactStore; storage is picked with `storage`:
+#   "journal"  append mutations to {user}.json.log (see journal.py)
+#   "json"     rewrite the whole file on every change
+#   "sqlite"   {user}.db (see sqlite_store.py)
+# and the in-memory layout with `columnar`: ContactIndex keeps one Contact
+# per record, ContactTable (contact_table.py) packs them into flat buffers
+# for books with millions of rows.
+#
+# Several processes can have the same book open. Every change runs inside
+# writing(): it takes the book's file lock, catches up on what the other
+# processes wrote since this one last looked (sync()), then validates,
+# applies and persists. A stale writer therefore merges instead of
+# overwriting.
+#
+# With write_behind=True (journal and json storage) the disk write moves off
+# the caller's thread: see write_behind.py. Call flush() or close() before
+# exiting.
+
+STATUSES = ("normal", "favourite", "blocked")
+
+class ContactError(ValueError):
+    pass
+
+class Contact:
+    # one record; supports c["name"] style access so the indexes and
+    # table code work the same as with the old dicts
+    __slots__ = ("iid", "name", "phone", "email", "status")
+
+    def __init__(self, name, phone, email="", status="normal"):
+        self.iid = None
+        self.name = name
+        self.phone = phone
+        self.email = email or ""
+        self.status = sys.intern(status)
+
+    @classmethod
+    def from_dict(cls, c):
+        c = journal.normalize(c)
+        return cls(c["name"], c["phone"], c["email"], c["status"])
+
+    def to_dict(self):
+        return {"name": self.name, "phone": self.phone, "email": self.email, "status": self.status}
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == "status":
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self):
+        return f"Contact({self.name!r}, {self.phone!r}, {self.email!r}, {self.status!r})"
+
+class Batch:
+    # changes queued for one ContactStore.commit(): nothing touches the book
+    # or the disk until then. Also a context manager that commits on a clean
+    # exit and drops the queue if the block raised.
+    def __init__(self, store):
+        self.store = store
+        self.ops = []
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, error, tb):
+        if kind is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def add(self, name, phone, email="", status="normal"):
+        self.ops.append(("add", (name, phone, email, status)))
+
+    def edit(self, iid, name, phone, email=""):
+        self.ops.append(("edit", (iid, name, phone, email)))
+
+    def delete(self, iids):
+        self.ops.append(("delete", (list(iids),)))
+
+    def set_status(self, iids, status):
+        self.ops.append(("set_status", (list(iids), status)))
+
+    def toggle_status(self, iids, status):
+        self.ops.append(("toggle_status", (list(iids), status)))
+
+    def commit(self):
+        ops, self.ops = self.ops, []
+        return self.store.commit(ops)
+
+    def rollback(self):
+        self.ops = []
+
+class ContactStore:
+    def __init__(self, path=None, storage="journal", sort_by_name=False, columnar=False, write_behind=False):
+        if columnar and sort_by_name:
+            raise ValueError("a columnar store keeps book order")
+        self.path = path
+        self.storage = storage
+        self.db = None
+        self.index = ContactTable() if columnar else ContactIndex()
+        self.sorted = SortedContacts() if sort_by_name else None
+        self.pending = None   # ops held back while a batch commits
+        self.position = None  # how far into the files this process has read
+        self.depth = 0
+        self.write_behind = write_behind
+        self.writer = None
+        self.mem_lock = threading.RLock()   # held while memory changes, so the writer sees it whole
+        self.changes = None   # while poll() syncs: which rows it touched
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.sorted if self.sorted is not None else self.index)
+
+    # --------- Load/Save ---------
+    def open(self, path, storage=None):
+        self.close()
+        self.path = path
+        if storage is not None:
+            self.storage = storage
+        with self.mem_lock:
+            self.clear()
+        self.position = None
+        if self.storage == "sqlite":
+            self.db = sqlite_store.migrate(path)
+        elif self.write_behind:
+            self.writer = WriteBehind(self)
+
+    def load(self):
+        self.flush()   # before the lock: the writer thread needs it to finish
+        with self.mem_lock:
+            self.clear()
+            if self.storage == "sqlite":
+                if self.db is None:
+                    self.db = sqlite_store.migrate(self.path)
+                self.position = sqlite_store.data_version(self.db)
+                records = sqlite_store.load(self.db)
+            else:
+                records, self.position = journal.load_at(self.path)
+            for c in records:
+                self.insert(Contact.from_dict(c))
+        return self
+
+    def iter_load(self):
+        # chunk stream for BackgroundLoader; feed each chunk to load_chunk()
+        if self.storage == "sqlite":
+            if self.db is None:
+                self.db = sqlite_store.migrate(self.path)
+            self.position = sqlite_store.data_version(self.db)
+            return sqlite_store.iter_load(sqlite_store.db_path(self.path))
+        return journal.iter_load(self.path)
+
+    def load_chunk(self, kind, payload):
+        # returns the ids of the contacts a "contacts" chunk added. A change
+        # made mid-load syncs, which reloads the whole book, so chunks after
+        # it skip the phones that are already in.
+        with self.mem_lock:
+            if kind == "contacts":
+                added = []
+                for c in payload:
+                    contact = Contact.from_dict(c)
+                    if not self.index.has_phone(contact.phone):
+                        added.append(self.insert(contact))
+                return added
+            elif kind == "position":
+                self.position = payload
+            else:
+                for op in payload:
+                    self.replay(op)
+
+    def to_list(self):
+        return [c.to_dict() for c in self]
+
+    def save(self):
+        self.flush()
+        with self.writing():
+            if self.storage == "sqlite":
+                sqlite_store.save(self.db, self.to_list())
+            else:
+                journal.save(self.path, self.to_list())
+                self.position = journal.position(self.path)
+
+    def record(self, *ops):
+        if self.pending is not None:
+            self.pending.extend(ops)
+            return
+        if not ops or self.path is None:
+            return
+        if self.writer is not None:
+            self.writer.push(ops)
+            return
+        with self.writing():
+            if self.storage == "sqlite":
+                sqlite_store.apply(self.db, *ops)
+            elif self.storage == "journal":
+                journal.append(self.path, *ops)
+                self.position = journal.position(self.path)
+            else:
+                self.save()
+
+    def flush(self):
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self):
+        # write out anything still queued and stop the writer thread. If
+        # that fails the writer (and its queue) stays, so a later close()
+        # can try again.
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def write_out(self, writer):
+        # called by the write-behind thread (or flush) with the ops it should
+        # persist. Only the snapshot of the queue and the position update
+        # hold mem_lock; the file I/O runs without it, so the Tk thread never
+        # waits on a write (or on another process holding the file lock).
+        # Memory is left to the caller's thread: if another process wrote
+        # first, position is dropped so the next sync() reloads.
+        with self.mem_lock:
+            ops = writer.take()
+            if not ops:
+                return
+            base = self.position
+            records = self.to_list() if self.storage == "json" else None
+        if self.storage == "journal":
+            with journal.locked(self.path):
+                incoming, _ = journal.read_since(self.path, base)
+                journal.append(self.path, *ops)
+                # the log now has theirs, then ours
+                position = journal.position(self.path) if incoming == [] else None
+        else:
+            # json: swap our copy in only if nobody else replaced the file meanwhile
+            tmp = journal.write_tmp(self.path, records)
+            with journal.locked(self.path):
+                if base is not None and journal.version(self.path) == base[0]:
+                    os.replace(tmp, self.path)
+                    position = journal.position(self.path)
+                else:
+                    # replay ours on top of what is there now
+                    os.remove(tmp)
+                    contacts = journal.load(self.path)
+                    positions = {c["phone"]: i for i, c in enumerate(contacts)}
+                    for op in ops:
+                        journal.apply_op(contacts, positions, op)
+                    journal.write_snapshot(self.path, [c for c in contacts if c is not None])
+                    position = None
+        with self.mem_lock:
+            writer.done(ops)
+            # a sync that ran meanwhile may have read our ops from the file and
+            # replayed them again from the queue: reload on the next one
+            self.position = position if self.position == base else None
+
+    # --------- Other processes ---------
+    @contextmanager
+    def writing(self):
+        if self.depth:
+            yield
+            return
+        if self.path is None:
+            with self.mem_lock:
+                yield
+            return
+        if self.writer is not None:
+            # the writer thread takes the file lock when it writes. The log
+            # is read before mem_lock is taken; sync() reads it again only if
+            # the writer moved position meanwhile.
+            seen = self.position
+            read = journal.read_since(self.path, seen)
+            with self.mem_lock:
+                self.depth += 1
+                try:
+                    self.sync(read if self.position == seen else None)
+                    yield
+                finally:
+                    self.depth -= 1
+            return
+        with self.mem_lock, journal.locked(self.path):
+            self.depth += 1
+            try:
+                self.sync()
+                yield
+            finally:
+                self.depth -= 1
+
+    def sync(self, read=None):
+        # catch up on changes other processes made since we last read;
+        # read: what journal.read_since returned for the current position
+        if self.storage == "sqlite":
+            if self.db is None:
+                return
+            if sqlite_store.data_version(self.db) != self.position:
+                self.reload()
+            return
+        ops, position = read or journal.read_since(self.path, self.position)
+        if ops is None or (ops and self.writer is not None and self.writer.queued()):
+            # ours are still queued and will land after theirs: rebuild in that order
+            self.reload()
+            return
+        for op in ops:
+            self.replay(op)
+        self.position = position
+
+    def reload(self):
+        # memory := the files, plus our ops still waiting in the write-behind queue
+        if self.storage == "sqlite":
+            self.position = sqlite_store.data_version(self.db)
+            records = sqlite_store.load(self.db)
+        else:
+            records, self.position = journal.load_at(self.path)
+        self.merge(records)
+        if self.writer is not None:
+            for op in self.writer.queued():
+                self.replay(op)
+
+    def merge(self, records):
+        # make memory match `records`, keeping the ids of contacts that stayed
+        fresh = {}
+        for c in records:
+            c = journal.normalize(c)
+            fresh[c["phone"]] = c
+        for iid, contact in list(self.items()):
+            c = fresh.pop(contact.phone, None)
+            if c is None:
+                self.drop(iid)
+            elif c != contact.to_dict():
+                self.swap(iid, Contact.from_dict(c))
+        for c in fresh.values():
+            self.insert(Contact.from_dict(c))
+
+    def poll(self):
+        # pick up changes made outside this process (other windows, the
+        # server, a synced folder replacing the file) and say which rows
+        # they touched: {"added", "changed", "removed"} sets of iids, or
+        # None if nothing changed. Cheap enough to call every second.
+        if self.path is None:
+            return None
+        with self.mem_lock:
+            self.changes = {"added": set(), "changed": set(), "removed": set()}
+            try:
+                self.sync()
+                changes = self.changes
+            finally:
+                self.changes = None
+        return changes if any(changes.values()) else None
+
+    # --------- In-memory bookkeeping ---------
+    def clear(self):
+        self.index.clear()
+        if self.sorted is not None:
+            self.sorted = SortedContacts()
+
+    def insert(self, contact):
+        contact.iid = self.index.add(contact)
+        if self.sorted is not None:
+            self.sorted.add(contact)
+        self.note("added", contact.iid)
+        return contact.iid
+
+    def swap(self, iid, contact):
+        old = self.index.get(iid)
+        contact.iid = iid
+        self.index.replace(iid, contact)
+        if self.sorted is not None:
+            self.sorted.replace(self.sorted.index(old), contact)
+        self.note("changed", iid)
+
+    def drop(self, iid):
+        contact = self.index.remove(iid)
+        if contact is not None and self.sorted is not None:
+            self.sorted.pop(self.sorted.index(contact))
+        if contact is not None:
+            self.note("removed", iid)
+        return contact
+
+    def note(self, kind, iid):
+        changes = self.changes
+        if changes is None:
+            return
+        if kind == "changed":
+            if iid not in changes["added"]:
+                changes["changed"].add(iid)
+        elif kind == "removed":
+            changes["changed"].discard(iid)
+            if iid in changes["added"]:
+                changes["added"].discard(iid)
+            else:
+                changes["removed"].add(iid)
+        else:
+            changes["added"].add(iid)
+
+    def replay(self, op):
+        # apply a journal-style op to memory only
+        kind = op.get("op")
+        if kind == "add":
+            contact = Contact.from_dict(op["contact"])
+            iid = self.index.find_phone(contact.phone)
+            if iid is None:
+                self.insert(contact)
+            else:
+                self.swap(iid, contact)
+        elif kind == "edit":
+            iid = self.index.find_phone(op["phone"])
+            other = self.index.find_phone(op["contact"]["phone"])
+            if iid is None:
+                iid = other
+            elif other is not None and other != iid:
+                self.drop(other)   # replayed over a book that already has the edit
+            if iid is not None:
+                self.swap(iid, Contact.from_dict(op["contact"]))
+        elif kind == "delete":
+            iid = self.index.find_phone(op["phone"])
+            if iid is not None:
+                self.drop(iid)
+        elif kind == "status":
+            iid = self.index.find_phone(op["phone"])
+            if iid is not None:
+                self.index.get(iid)["status"] = op["status"]
+                self.note("changed", iid)
+
+    # --------- Queries ---------
+    def get(self, iid):
+        return self.index.get(iid)
+
+    def items(self):
+        if self.sorted is not None:
+            return [(c.iid, c) for c in self.sorted]
+        return self.index.rows()
+
+    def has_phone(self, phone):
+        # mid-batch the database lags the book, so ask the index
+        if self.storage == "sqlite" and self.db is not None and self.pending is None:
+            return sqlite_store.phone_exists(self.db, phone)
+        return self.index.has_phone(phone)
+
+    def rows_for(self, found):
+        # map rows returned by the SQLite backend back to record ids
+        iids = dict.fromkeys(self.index.find_phone(c["phone"]) for c in found)
+        return [(iid, self.index.get(iid)) for iid in iids if iid is not None]
+
+    def order(self, rows):
+        if self.sorted is not None:
+            rows.sort(key=lambda r: r[1].name.casefold())
+        return rows
+
+    def search(self, term):
+        if self.storage == "sqlite" and self.db is not None:
+            return self.order(self.rows_for(sqlite_store.search(self.db, term)))
+        return self.order(self.index.search(term))
+
+    def filter(self, status):
+        if self.storage == "sqlite" and self.db is not None:
+            return self.order(self.rows_for(sqlite_store.by_status(self.db, status)))
+        if self.sorted is not None:
+            return [(iid, c) for iid, c in self.items() if c.status == status]
+        return self.index.with_status(status)
+
+    # --------- Mutations ---------
+    def validate(self, name, phone, old_phone=None, taken=None, email=""):
+        # runs before anything is indexed, so a bad record leaves no trace;
+        # no email (None, as from a cancelled prompt) is the same as ""
+        if not all(isinstance(v, str) for v in (name, phone, "" if email is None else email)):
+            raise ContactError("Name, Phone and Email must be text!")
+        if not name or not phone:
+            raise ContactError("Name and Phone are required!")
+        if phone != old_phone and (taken or self.has_phone)(phone):
+            raise ContactError("Contact already exists!")
+
+    def add(self, name, phone, email="", status="normal"):
+        with self.writing():
+            self.validate(name, phone, email=email)
+            if status not in STATUSES:
+                raise ContactError(f"Unknown status: {status}")
+            contact = Contact(name, phone, email, status)
+            iid = self.insert(contact)
+            self.record({"op": "add", "contact": contact.to_dict()})
+            return iid
+
+    def edit(self, iid, name, phone, email=""):
+        with self.writing():
+            old = self.index.get(iid)
+            if old is None:
+                raise ContactError("Contact not found!")
+            old_phone = old.phone   # read before swap(): a ContactTable row follows the edit
+            self.validate(name, phone, old_phone, email=email)
+            contact = Contact(name, phone, email, old.status)
+            self.swap(iid, contact)
+            self.record({"op": "edit", "phone": old_phone, "contact": contact.to_dict()})
+            return contact
+
+    def delete(self, iids):
+        with self.writing():
+            ops = []
+            for iid in iids:
+                contact = self.drop(iid)
+                if contact is not None:
+                    ops.append({"op": "delete", "phone": contact.phone})
+            self.record(*ops)
+            return len(ops)
+
+    def set_status(self, iids, status):
+        with self.writing():
+            if status not in STATUSES:
+                raise ContactError(f"Unknown status: {status}")
+            ops = []
+            for iid in iids:
+                contact = self.index.get(iid)
+                if contact is not None and contact.status != status:
+                    contact.status = sys.intern(status)
+                    ops.append({"op": "status", "phone": contact.phone, "status": contact.status})
+            self.record(*ops)
+            return len(ops)
+
+    def toggle_status(self, iids, status):
+        # like the Favourite/Block buttons: set it, or back to normal if already set
+        with self.writing():
+            if status not in STATUSES:
+                raise ContactError(f"Unknown status: {status}")
+            ops = []
+            for iid in iids:
+                contact = self.index.get(iid)
+                if contact is not None:
+                    contact.status = sys.intern(status if contact.status != status else "normal")
+                    ops.append({"op": "status", "phone": contact.phone, "status": contact.status})
+            self.record(*ops)
+            return len(ops)
+
+    # --------- Batches ---------
+    def batch(self):
+        return Batch(self)
+
+    def check(self, ops):
+        # dry run of a batch: which phones it frees and claims, so every op
+        # is validated against the book as the earlier ops would leave it
+        claimed, freed, phones, gone = set(), set(), {}, set()
+
+        def taken(phone):
+            return phone in claimed or (phone not in freed and self.has_phone(phone))
+
+        def move(old_phone, new_phone):
+            if old_phone is not None:
+                claimed.discard(old_phone)
+                freed.add(old_phone)
+            if new_phone is not None:
+                freed.discard(new_phone)
+                claimed.add(new_phone)
+
+        for kind, args in ops:
+            if kind == "add":
+                name, phone = args[0], args[1]
+                self.validate(name, phone, taken=taken, email=args[2] if len(args) > 2 else "")
+                if len(args) > 3 and args[3] not in STATUSES:
+                    raise ContactError(f"Unknown status: {args[3]}")
+                move(None, phone)
+            elif kind == "edit":
+                iid, name, phone = args[0], args[1], args[2]
+                old = self.index.get(iid)
+                if old is None or iid in gone:
+                    raise ContactError("Contact not found!")
+                old_phone = phones.get(iid, old.phone)
+                self.validate(name, phone, old_phone, taken=taken, email=args[3] if len(args) > 3 else "")
+                if phone != old_phone:
+                    move(old_phone, phone)
+                phones[iid] = phone
+            elif kind == "delete":
+                for iid in args[0]:
+                    old = self.index.get(iid)
+                    if old is not None and iid not in gone:
+                        gone.add(iid)
+                        move(phones.get(iid, old.phone), None)
+            elif args[1] not in STATUSES:
+                raise ContactError(f"Unknown status: {args[1]}")
+
+    def commit(self, ops):
+        # apply a batch and persist it with a single record() call; if
+        # anything fails after check() the book is reloaded from disk
+        with self.writing():
+            self.check(ops)
+            self.pending = []
+            try:
+                for kind, args in ops:
+                    getattr(self, kind)(*args)
+                pending, self.pending = self.pending, None
+                self.record(*pending)
+            except Exception:
+                self.pending = None
+                if self.path is not None:
+                    self.reload()
+                raise
+            return len(pending)
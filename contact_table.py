@@ -0,0 +1,281 @@
+import sys
+from array import array
+from bisect import bisect_right
+
+# Columnar contact book for very large shared directories. Names, phones
+# and emails are UTF-8 strings packed back to back in one bytearray per
+# column (each followed by a NUL) with an offset array; status is one byte
+# per row. Rows are handed out as lightweight Row views that decode a
+# field only when it is read, and row lists are RowList sequences over an
+# array of row numbers rather than millions of tuples. The one per-row
+# Python object kept is a phone -> row dict, so the duplicate check on
+# every add is a lookup rather than a scan of the phone column.
+#
+# Offers the same interface as ContactIndex, so ContactStore, the search
+# session and the table code can use either one.
+
+SEP = b"\x00"
+STATUS_CODES = {"normal": 0, "favourite": 1, "blocked": 2}
+STATUS_NAMES = {code: sys.intern(name) for name, code in STATUS_CODES.items()}
+DELETED = 255
+
+class Column:
+    def __init__(self):
+        self.data = bytearray(SEP)   # leading NUL so every value sits between two
+        self.starts = array("Q")
+
+    def __len__(self):
+        return len(self.starts)
+
+    def append(self, text):
+        self.starts.append(len(self.data))
+        self.data += text.encode("utf-8")
+        self.data += SEP
+
+    def get(self, i):
+        start = self.starts[i]
+        end = self.starts[i + 1] - 1 if i + 1 < len(self.starts) else len(self.data) - 1
+        return self.data[start:end].decode("utf-8")
+
+    def find(self, needle):
+        # record numbers whose value contains needle
+        needle = needle.encode("utf-8")
+        data, starts = self.data, self.starts
+        pos = data.find(needle)
+        while pos != -1:
+            i = bisect_right(starts, pos) - 1
+            yield i
+            if i + 1 >= len(starts):
+                return
+            pos = data.find(needle, starts[i + 1])
+
+class Row:
+    __slots__ = ("table", "row")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    @property
+    def iid(self):
+        return str(self.row)
+
+    @property
+    def name(self):
+        return self.table.names.get(self.table.phys[self.row])
+
+    @property
+    def phone(self):
+        return self.table.phones.get(self.table.phys[self.row])
+
+    @property
+    def email(self):
+        return self.table.emails.get(self.table.phys[self.row])
+
+    @property
+    def status(self):
+        return STATUS_NAMES.get(self.table.status[self.row], "normal")   # deleted rows read as normal
+
+    @status.setter
+    def status(self, value):
+        self.table.set_status(self.row, value)
+
+    def __getitem__(self, key):
+        if key not in ("name", "phone", "email", "status"):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key != "status":
+            raise KeyError(key)
+        self.status = value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        return {"name": self.name, "phone": self.phone, "email": self.email, "status": self.status}
+
+class RowList:
+    # sequence of (iid, Row) over an array of row numbers; changing it
+    # changes which rows it lists, never the table
+    def __init__(self, table, rows):
+        self.table = table
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [(str(r), Row(self.table, r)) for r in self.rows[i]]
+        r = self.rows[i]
+        return str(r), Row(self.table, r)
+
+    def __iter__(self):
+        table = self.table
+        for r in self.rows:
+            yield str(r), Row(table, r)
+
+    def own(self):
+        # a range (or list) becomes an array the first time the list changes
+        if not isinstance(self.rows, array):
+            self.rows = array("q", self.rows)
+        return self.rows
+
+    def extend(self, pairs):
+        # (iid, row) pairs from the same table, say rows loaded after this list was made
+        self.own().extend(int(iid) for iid, _ in pairs)
+
+    def insert(self, i, pair):
+        self.own().insert(i, int(pair[0]))
+
+    def __setitem__(self, i, pair):
+        self.own()[i] = int(pair[0])
+
+    def __delitem__(self, i):
+        del self.own()[i]
+
+class ContactTable:
+    def __init__(self, contacts=()):
+        self.clear()
+        self.extend(contacts)
+
+    def clear(self):
+        self.names = Column()
+        self.lower_names = Column()
+        self.phones = Column()
+        self.emails = Column()
+        self.lower_emails = Column()
+        self.owner = array("q")   # physical record -> row, -1 once superseded
+        self.phys = array("q")    # row -> physical record
+        self.status = bytearray()
+        self.by_phone = {}        # phone -> row, live rows only
+        self.deleted = 0
+        self.version = getattr(self, "version", 0) + 1
+
+    def __len__(self):
+        return len(self.phys) - self.deleted
+
+    def __iter__(self):
+        for _, row in self.rows():
+            yield row
+
+    # --------- Rows ---------
+    def live(self):
+        if not self.deleted:
+            return range(len(self.phys))
+        return array("q", (r for r, s in enumerate(self.status) if s != DELETED))
+
+    def rows(self):
+        return RowList(self, self.live())
+
+    items = rows
+
+    def get(self, iid):
+        try:
+            r = int(iid)
+        except (TypeError, ValueError):
+            return None
+        if 0 <= r < len(self.status) and self.status[r] != DELETED:
+            return Row(self, r)
+        return None
+
+    def find_phone(self, phone):
+        r = self.by_phone.get(phone)
+        return None if r is None else str(r)
+
+    def has_phone(self, phone):
+        return phone in self.by_phone
+
+    # --------- Mutations ---------
+    def write(self, contact):
+        self.names.append(contact["name"])
+        self.lower_names.append(contact["name"].lower())
+        self.phones.append(contact["phone"])
+        email = contact.get("email") or ""
+        self.emails.append(email)
+        self.lower_emails.append(email.lower())
+        return len(self.names) - 1
+
+    def add(self, contact):
+        r = len(self.phys)
+        p = self.write(contact)
+        self.owner.append(r)
+        self.phys.append(p)
+        self.status.append(STATUS_CODES.get(contact.get("status") or "normal", 0))
+        self.by_phone[contact["phone"]] = r
+        self.version += 1
+        return str(r)
+
+    def extend(self, contacts):
+        for c in contacts:
+            self.add(c)
+
+    def replace(self, iid, contact):
+        # strings can't be rewritten in place, so the row points at a new record
+        r = int(iid)
+        old_phone = self.phones.get(self.phys[r])
+        if self.by_phone.get(old_phone) == r:
+            del self.by_phone[old_phone]
+        self.by_phone[contact["phone"]] = r
+        self.owner[self.phys[r]] = -1
+        p = self.write(contact)
+        self.owner.append(r)
+        self.phys[r] = p
+        self.status[r] = STATUS_CODES.get(contact.get("status") or "normal", 0)
+        self.version += 1
+
+    def remove(self, iid):
+        # the returned Row keeps reading its old record, which is never reused
+        row = self.get(iid)
+        if row is None:
+            return None
+        self.status[row.row] = DELETED
+        if self.by_phone.get(row.phone) == row.row:
+            del self.by_phone[row.phone]
+        self.owner[self.phys[row.row]] = -1
+        self.deleted += 1
+        self.version += 1
+        return row
+
+    def set_status(self, row, status):
+        self.status[row] = STATUS_CODES[status]
+
+    # --------- Queries ---------
+    def with_status(self, status):
+        code = bytes([STATUS_CODES[status]])
+        found = array("q")
+        data = self.status
+        pos = data.find(code)
+        while pos != -1:
+            found.append(pos)
+            pos = data.find(code, pos + 1)
+        return RowList(self, found)
+
+    def candidates(self, term):
+        # exact matches already: the column scans run in C over the buffers
+        return [str(r) for r in self.search_rows(term)]
+
+    def matches(self, iid, term):
+        row = self.get(iid)
+        return row is not None and (term in row.name.lower() or term in row.phone or term in row.email.lower())
+
+    def search_rows(self, term):
+        if not term:
+            return self.live()
+        found = set()
+        for column in (self.lower_names, self.phones, self.lower_emails):
+            found.update(column.find(term))
+        rows = {self.owner[p] for p in found}
+        rows.discard(-1)
+        return array("q", sorted(r for r in rows if self.status[r] != DELETED))
+
+    def search(self, term):
+        return RowList(self, self.search_rows(term.lower()))
+
+    def to_list(self):
+        return [row.to_dict() for row in self]
@@ -0,0 +1,98 @@
+import hashlib, os, shutil, sys
+from urllib.parse import quote
+
+# Where the apps keep their files. Everything lives under DATA_ROOT
+# (`data/`, or $CONTACT_BOOK_DATA): users.json at the top, and each user's
+# book two directory levels down, picked by a hash of the name, so no
+# directory ever holds more than a few hundred entries:
+#
+#   data/users.json
+#   data/books/3f/a2/sushant.json   (+ .json.log, .db, ...)
+#
+# Older installs kept everything flat in the working directory. The apps
+# call migrate() once at startup, which moves users.json and every known
+# user's files over (`python data_dir.py [--from DIR] [--root DIR]` does
+# the same by hand, and also hashes any plaintext passwords left in
+# users.json); the path functions below never move anything. A
+# name that can't be a flat file name (one with a path separator, "." or
+# "..", or "users", whose book would be users.json) is never looked up
+# in the old layout.
+
+DATA_ROOT = os.environ.get("CONTACT_BOOK_DATA", "data")
+LEGACY_DIR = "."
+SHARD_LEVELS = 2
+USER_FILE = "users.json"
+# every file that belongs to one book, by suffix after the user's name
+BOOK_SUFFIXES = (".json", ".json.log", ".json.log.compacting", ".db", ".db-wal", ".db-shm")
+
+def shard(user):
+    digest = hashlib.sha1(user.encode("utf-8")).hexdigest()
+    return [digest[2 * i:2 * i + 2] for i in range(SHARD_LEVELS)]
+
+def legacy_name_ok(user):
+    # whether {user}.json in the flat layout is that user's book
+    return (user not in ("", ".", "..") and not any(c in user for c in "/\\\0")
+            and (user + ".json").lower() != USER_FILE.lower())
+
+def book_path(user, root=None):
+    root = root or DATA_ROOT
+    return os.path.join(root, "books", *shard(user), quote(user, safe="") + ".json")
+
+def move(src, dst):
+    if os.path.exists(src) and not os.path.exists(dst):
+        os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+        shutil.move(src, dst)
+        return True
+    return False
+
+# --------- Paths the apps use ---------
+def users_file(root=None):
+    return os.path.join(root or DATA_ROOT, USER_FILE)
+
+def user_book(user, root=None):
+    path = book_path(user, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+# --------- Migration ---------
+def migrate(legacy=LEGACY_DIR, root=None):
+    # move users.json and every known user's files over from the flat
+    # layout; safe to run again. Plaintext passwords are left to be hashed
+    # at their owner's next login (hashing them all here would hold up
+    # every startup). Returns ([(user, new path)], [users whose names were skipped]).
+    from user_registry import UserRegistry
+    root = root or DATA_ROOT
+    os.makedirs(root, exist_ok=True)
+    path = users_file(root)
+    for suffix in ("", ".log"):
+        move(os.path.join(legacy, USER_FILE + suffix), path + suffix)
+    registry = UserRegistry(path)
+    moved, skipped = [], []
+    for user in registry.names():
+        if not legacy_name_ok(user):
+            skipped.append(user)
+            continue
+        base = os.path.join(legacy, user)
+        if any(os.path.exists(base + s) for s in BOOK_SUFFIXES):
+            book = user_book(user, root)
+            for suffix in BOOK_SUFFIXES:
+                move(base + suffix, book[:-len(".json")] + suffix)
+            moved.append((user, book))
+    return moved, skipped
+
+if __name__ == "__main__":
+    # python data_dir.py [--from DIR] [--root DIR]
+    args = sys.argv[1:]
+    options = dict(zip(args[::2], args[1::2]))
+    legacy = options.get("--from", LEGACY_DIR)
+    root = options.get("--root", DATA_ROOT)
+    moved, skipped = migrate(legacy, root)
+    for user, path in moved:
+        print(f"{user} -> {path}")
+    for user in skipped:
+        print(f"{user!r}: not a usable file name, not looked for in {legacy}")
+    # run by hand, so there is time to hash every plaintext password now
+    from user_registry import UserRegistry
+    hashed = UserRegistry(users_file(root)).hash_plaintext()
+    if hashed:
+        print(f"hashed {hashed} plaintext password(s)")
@@ -0,0 +1,88 @@
+import csv, json, os, sys
+
+# Export a contact book as CSV, vCard or newline-delimited JSON. Every
+# format is a generator of lines over the book's own records, so a big
+# book is written out one contact at a time instead of being copied into
+# a second list (or one huge string) first; from the command line the
+# book itself is streamed off disk too (journal.iter_contacts). The CSV
+# header matches what importer.py reads back.
+#
+#   python exporter.py sushant.json sushant.csv
+#   python exporter.py sushant.json - --format ndjson | gzip > backup.gz
+
+FIELDS = ("name", "phone", "email", "status")
+
+class _Line:
+    # csv.writer hands back whatever write() returns
+    def write(self, text):
+        return text
+
+def csv_lines(contacts):
+    writer = csv.writer(_Line())
+    yield writer.writerow([f.capitalize() for f in FIELDS])
+    for c in contacts:
+        yield writer.writerow([c["name"], c["phone"], c["email"], c["status"]])
+
+def escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace(",", "\\,").replace(";", "\\;")
+
+def vcard_lines(contacts):
+    for c in contacts:
+        name = escape(c["name"])
+        given, _, family = c["name"].rpartition(" ")
+        if not given:
+            given, family = family, ""
+        yield "BEGIN:VCARD\r\nVERSION:3.0\r\n"
+        yield f"FN:{name}\r\nN:{escape(family)};{escape(given)};;;\r\n"
+        yield f"TEL;TYPE=CELL:{escape(c['phone'])}\r\n"
+        if c["email"]:
+            yield f"EMAIL;TYPE=INTERNET:{escape(c['email'])}\r\n"
+        if c["status"] != "normal":
+            yield f"CATEGORIES:{c['status']}\r\n"
+        yield "END:VCARD\r\n"
+
+def ndjson_lines(contacts):
+    for c in contacts:
+        yield json.dumps({f: c[f] for f in FIELDS}) + "\n"
+
+FORMATS = {"csv": csv_lines, "vcard": vcard_lines, "ndjson": ndjson_lines}
+EXTENSIONS = {".csv": "csv", ".vcf": "vcard", ".vcard": "vcard", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+def format_of(path):
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), "csv")
+
+def export(contacts, out, fmt=None):
+    # out: a path ("-" for stdout) or an open text file
+    if out == "-":
+        out = sys.stdout
+    if not isinstance(out, str):
+        out.writelines(FORMATS[fmt or "csv"](contacts))
+        return
+    fmt = fmt or format_of(out)
+    tmp = out + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            f.writelines(FORMATS[fmt](contacts))
+        os.replace(tmp, out)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+if __name__ == "__main__":
+    # python exporter.py BOOK.json [OUT|-] [--format csv|vcard|ndjson]
+    import journal, sqlite_store
+    args = sys.argv[1:]
+    fmt = None
+    if "--format" in args:
+        i = args.index("--format")
+        fmt = args[i + 1]
+        del args[i:i + 2]
+    if not args:
+        sys.exit("usage: python exporter.py BOOK.json [OUT|-] [--format csv|vcard|ndjson]")
+    book = args[0]
+    out = args[1] if len(args) > 1 else "-"
+    if book.endswith(".db"):
+        contacts = (c for kind, chunk, _ in sqlite_store.iter_load(book) if kind == "contacts" for c in chunk)
+    else:
+        contacts = journal.iter_contacts(book)
+    export(contacts, out, fmt)
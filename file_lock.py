@@ -0,0 +1,84 @@
+import os, threading
+
+# Advisory lock shared by every process that opens the same book. Each
+# book gets a `{path}.lock` file that is flock()ed (or msvcrt-locked on
+# Windows) while a writer is inside; readers never take it. The lock is
+# reentrant within a process, so a store method that takes it can call
+# another that does too.
+
+try:
+    import fcntl
+
+    def lock_fd(fd):
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def unlock_fd(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+except ImportError:
+    import msvcrt
+
+    def lock_fd(fd):
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)   # gives up after ~10s; keep waiting
+                return
+            except OSError:
+                pass
+
+    def unlock_fd(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+LOCK_SUFFIX = ".lock"
+
+class FileLock:
+    def __init__(self, path):
+        self.path = path
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.fd = None
+
+    def acquire(self):
+        self.thread_lock.acquire()
+        if self.depth == 0:
+            try:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    lock_fd(fd)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            except BaseException:
+                self.thread_lock.release()
+                raise
+            self.fd = fd
+        self.depth += 1
+
+    def release(self):
+        self.depth -= 1
+        if self.depth == 0:
+            fd, self.fd = self.fd, None
+            try:
+                unlock_fd(fd)
+            finally:
+                os.close(fd)
+        self.thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, kind, error, tb):
+        self.release()
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+def lock_for(path):
+    # the one FileLock for `path` in this process
+    key = os.path.abspath(path) + LOCK_SUFFIX
+    with _locks_lock:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = FileLock(key)
+        return lock
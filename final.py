@@ -1,169 +1,314 @@
 import customtkinter as ctk
 import tkinter as tk
-from tkinter import messagebox, ttk, simpledialog
+from tkinter import messagebox, ttk, simpledialog, filedialog
 from PIL import Image, ImageTk
-import json, os
-
-USER_FILE = "users.json"
-contacts = []
+import bisect, os
+import data_dir
+import tree_patch, importer, exporter
+from contact_store import ContactStore, ContactError
+from user_registry import UserRegistry
+from virtual_tree import VirtualTree
+from search_session import SearchSession
+from search_pipeline import SearchPipeline, FRAME_BUDGET_MS
+from background_loader import BackgroundLoader, run_in_background
+
+USER_FILE = data_dir.users_file()  # data/users.json; see data_dir.py
+users = UserRegistry(USER_FILE)  # signups go to users.json.log
+STORAGE = "journal"  # "journal" (append to {user}.json.log), "json" (rewrite file) or "sqlite" ({user}.db)
+VIRTUAL = True  # only create Treeview items for the rows in view
+COLUMNAR = False  # pack the book into flat buffers (contact_table.py) for very large books
+WRITE_BEHIND = True  # save on a background thread (journal/json); see write_behind.py
+WATCH_MS = 1000  # how often to look for changes made outside this window
+store = ContactStore(storage=STORAGE, columnar=COLUMNAR, write_behind=WRITE_BEHIND)
+session = SearchSession(store.index, store.mem_lock)
 current_user = None
 contacts_file = None
+shown = {}  # iid -> values currently in the (non-virtual) Treeview
+view = None  # what the table shows: None (all), "search" or a status
+loading = False
 
 # --------- Contact Load/Save ---------
-def load_contacts():
-    global contacts_file
-    if os.path.exists(contacts_file):
-        with open(contacts_file, "r") as f:
-            raw_contacts = json.load(f)
-            fixed_contacts = []
-            for c in raw_contacts:
-                status = c.get("status", "normal")
-                if c.get("favourite"):
-                    status = "favourite"
-                if c.get("blocked"):
-                    status = "blocked"
-                fixed_contacts.append({
-                    "name": c["name"],
-                    "phone": c["phone"],
-                    "email": c.get("email", ""),
-                    "status": status
-                })
-            return fixed_contacts
-    return []
+def start_loading(root):
+    global loading
+    loading = True
+    store.open(contacts_file, STORAGE)
+    progress = ctk.CTkProgressBar(root)
+    progress.set(0)
+    progress.pack(side="bottom", fill="x", padx=10, pady=5)
+
+    def on_chunk(kind, payload, done):
+        added = store.load_chunk(kind, payload)
+        progress.set(done)
+        if kind == "contacts":
+            append_rows(added)
+        elif kind == "ops" and payload:
+            refresh_view()   # the log may touch any row
+
+    def on_done(error=None):
+        global loading
+        loading = False
+        progress.destroy()
+        refresh_view()
+        if error is not None:
+            messagebox.showerror("Error", f"Could not load contacts: {error}")
+
+    BackgroundLoader(root, store.iter_load(), on_chunk, on_done)
 
 def save_contacts():
-    global contacts_file
-    with open(contacts_file, "w") as f:
-        json.dump(contacts, f, indent=4)
+    store.save()
+
+def watch_contacts(root):
+    # other windows, the server or a synced folder may change the book while
+    # it is open: merge just the records that changed and patch those rows
+    if not loading:
+        try:
+            changes = store.poll()
+        except OSError:
+            changes = None   # mid-replace on a network drive; look again next time
+        if changes:
+            apply_changes(changes)
+    root.after(WATCH_MS, watch_contacts, root)
+
+def in_view(iid, contact):
+    if view == "search":
+        return store.index.matches(iid, search_var.get().lower())
+    return view is None or contact.status == view
+
+def apply_changes(changes):
+    # put just the rows poll() named into the table: delete the removed ones
+    # and the ones that left the current view, update or insert the rest in
+    # book order (iid order)
+    global shown
+    gone, rows = set(changes["removed"]), {}
+    for iid in changes["added"] | changes["changed"]:
+        contact = store.get(iid)
+        if contact is not None and in_view(iid, contact):
+            rows[iid] = contact
+        else:
+            gone.add(iid)
+    if VIRTUAL:
+        tree.patch_rows(gone, rows)
+        return
+    for iid in gone:
+        if shown.pop(iid, None) is not None:
+            tree.delete(iid)
+    keys, moved = [int(iid) for iid in shown], False
+    for iid in sorted(rows, key=int):
+        values = row_values(rows[iid])
+        if iid not in shown:
+            i = bisect.bisect_left(keys, int(iid))
+            keys.insert(i, int(iid))
+            tree.insert("", i, iid=iid, values=values)
+            moved = True
+        elif shown[iid] != values:
+            tree.item(iid, values=values)
+        shown[iid] = values
+    if moved:
+        shown = dict(sorted(shown.items(), key=lambda r: int(r[0])))
+
+def import_contacts(root):
+    global loading
+    if busy():
+        return
+    path = filedialog.askopenfilename(title="Import Contacts", filetypes=[
+        ("Contacts", "*.csv *.vcf *.vcard"), ("CSV", "*.csv"), ("vCard", "*.vcf *.vcard")])
+    if not path:
+        return
+    loading = True
+    job = importer.Import(store)
+    progress = ctk.CTkProgressBar(root)
+    progress.set(0)
+    progress.pack(side="bottom", fill="x", padx=10, pady=5)
+
+    def on_chunk(kind, records, done):
+        job.feed(records)
+        progress.set(done)
+
+    def on_done(error=None):
+        global loading
+        loading = False
+        progress.destroy()
+        if error is not None:
+            messagebox.showerror("Error", f"Could not import {os.path.basename(path)}: {error}")
+            return
+        try:
+            counts = job.commit()
+        except (ContactError, OSError) as e:
+            messagebox.showerror("Error", f"Import failed, nothing was added: {e}")
+            return
+        finally:
+            refresh_table()
+        messagebox.showinfo("Import", f"Added {counts['added']} contacts "
+                            f"({counts['duplicates']} duplicates, {counts['invalid']} without name or phone skipped).")
 
-# --------- User Management ---------
-def save_user(username, password):
-    users = {}
-    if not os.path.exists(USER_FILE):
-        with open(USER_FILE, "w") as f:
-            json.dump({}, f)
+    BackgroundLoader(root, importer.iter_chunks(path), on_chunk, on_done)
+
+def export_contacts():
+    if busy():
+        return
+    path = filedialog.asksaveasfilename(title="Export Contacts", defaultextension=".csv",
+                                        initialfile=f"{current_user}_contacts.csv", filetypes=[
+        ("CSV", "*.csv"), ("vCard", "*.vcf"), ("NDJSON", "*.ndjson")])
+    if not path:
+        return
     try:
-        with open(USER_FILE, "r") as f:
-            users = json.load(f)
-    except json.JSONDecodeError:
-        users = {}
-    if username in users:
-        messagebox.showerror("Error", "Username already exists!")
+        exporter.export(store, path)
+    except OSError as e:
+        messagebox.showerror("Error", f"Could not export contacts: {e}")
         return
-    users[username] = password
-    with open(USER_FILE, "w") as f:
-        json.dump(users, f, indent=4)
+    messagebox.showinfo("Export", f"Exported {len(store)} contacts to {os.path.basename(path)}.")
 
-def check_user(username, password):
-    if not os.path.exists(USER_FILE):
-        return False
+def exit_app(root):
+    # write out anything still queued before the window goes away
     try:
-        with open(USER_FILE, "r") as f:
-            users = json.load(f)
-        return users.get(username) == password
-    except json.JSONDecodeError:
-        return False
+        store.close()
+    except OSError as e:
+        if not messagebox.askyesno("Error", f"Could not save contacts: {e}\n\nQuit anyway?"):
+            return
+    root.quit()
+
+# --------- User Management ---------
+def save_user(username, password):
+    # False if the name is taken
+    return users.add(username, password)
+
+def check_user(username, password):
+    return users.check(username, password)
 
 # --------- Contact Operations ---------
+def busy():
+    # changes wait while the book loads or an import runs
+    if loading:
+        messagebox.showinfo("Loading", "Contacts are still loading, try again in a moment.")
+    return loading
+
 def add_contact():
     name, phone, email = name_var.get(), phone_var.get(), email_var.get()
-    if not name or not phone:
-        messagebox.showerror("Error", "Name and Phone are required!")
+    if name and phone and busy():
+        return
+    try:
+        store.add(name, phone, email)
+    except ContactError as e:
+        messagebox.showerror("Error", str(e))
         return
-    for c in contacts:
-        if c["phone"] == phone:
-            messagebox.showerror("Error", "Contact already exists!")
-            return
-    contacts.append({"name": name, "phone": phone, "email": email, "status": "normal"})
-    save_contacts()
     refresh_table()
     clear_fields()
     messagebox.showinfo("Success", "Contact added!")
 
 def delete_contact():
     selected = tree.selection()
-    if not selected:
+    if not selected or busy():
         return
-    for item in selected:
-        values = tree.item(item, "values")
-        for c in contacts:
-            if c["name"] == values[0] and c["phone"] == values[1]:
-                contacts.remove(c)
-                break
-    save_contacts()
+    store.delete(selected)
     refresh_table()
 
 def edit_contact():
     selected = tree.selection()
-    if not selected:
+    if not selected or busy():
         return
     item = selected[0]
-    values = tree.item(item, "values")
-    for i, c in enumerate(contacts):
-        if c["name"] == values[0] and c["phone"] == values[1]:
-            name = simpledialog.askstring("Edit", "New name:", initialvalue=c["name"])
-            phone = simpledialog.askstring("Edit", "New phone:", initialvalue=c["phone"])
-            email = simpledialog.askstring("Edit", "New email:", initialvalue=c["email"])
-            if name and phone:
-                contacts[i] = {"name": name, "phone": phone, "email": email, "status": c["status"]}
-                break
-    save_contacts()
+    c = store.get(item)
+    if c is None:
+        return
+    name = simpledialog.askstring("Edit", "New name:", initialvalue=c.name)
+    phone = simpledialog.askstring("Edit", "New phone:", initialvalue=c.phone)
+    email = simpledialog.askstring("Edit", "New email:", initialvalue=c.email)
+    if not name or not phone:
+        return
+    try:
+        store.edit(item, name, phone, email)
+    except ContactError as e:
+        messagebox.showerror("Error", str(e))
+        return
     refresh_table()
 
+def row_values(contact):
+    emoji = {"favourite": "⭐", "blocked": "🚫"}.get(contact.status, "🙂")
+    return (contact.name, contact.phone, contact.email, emoji)
+
 def refresh_table(filtered=None):
-    tree.delete(*tree.get_children())
-    data = filtered if filtered is not None else contacts
-    for contact in data:
-        emoji = {"favourite": "⭐", "blocked": "🚫"}.get(contact["status"], "🙂")
-        tree.insert("", "end", values=(contact["name"], contact["phone"], contact["email"], emoji))
+    global shown, view
+    if filtered is None:
+        view = None
+    data = filtered if filtered is not None else store.items()
+    if VIRTUAL:
+        tree.set_rows(data)
+        return
+    shown = tree_patch.patch(tree, shown, [(iid, row_values(c)) for iid, c in data])
+
+def append_rows(iids):
+    # contacts loaded after the table was drawn: add just the ones the
+    # current view shows, after the rows already there
+    rows = [(iid, store.get(iid)) for iid in iids]
+    if view == "search":
+        term = search_var.get().lower()
+        rows = [(iid, c) for iid, c in rows if store.index.matches(iid, term)]
+    elif view is not None:
+        rows = [(iid, c) for iid, c in rows if c.status == view]
+    if VIRTUAL:
+        tree.append_rows(rows)
+        return
+    for iid, c in rows:
+        shown[iid] = row_values(c)
+        tree.insert("", "end", iid=iid, values=shown[iid])
 
 def clear_fields():
     name_var.set("")
     phone_var.set("")
     email_var.set("")
 
+def refresh_view():
+    # redraw the current view; only rows whose values changed touch Tk
+    if view == "search":
+        search_contact()
+    elif view is not None:
+        show_status(view)
+    else:
+        refresh_table()
+
 def search_contact():
+    global view
+    view = "search"
     term = search_var.get().lower()
-    filtered = [c for c in contacts if term in c["name"].lower() or term in c["phone"]]
-    refresh_table(filtered)
-
-def toggle_favourite():
+    if STORAGE == "sqlite":
+        # the query runs on the book's shared connection, which only the Tk
+        # thread uses here (sqlite_store.connect leaves callers to serialise)
+        refresh_table(store.search(term))
+    else:
+        pipeline.request(term)
+
+def report_search(found, latency_ms, render_ms):
+    late = " ⚠" if render_ms > FRAME_BUDGET_MS else ""
+    search_info.configure(text=f"{found} found · {latency_ms:.0f} ms (render {render_ms:.1f} ms){late}")
+
+def toggle_status(status):
     selected = tree.selection()
-    if not selected:
+    if not selected or busy():
         return
-    for item in selected:
-        values = tree.item(item, "values")
-        for c in contacts:
-            if c["name"] == values[0] and c["phone"] == values[1]:
-                c["status"] = "favourite" if c["status"] != "favourite" else "normal"
-                break
-    save_contacts()
+    store.toggle_status(selected, status)
     refresh_table()
 
+def toggle_favourite():
+    toggle_status("favourite")
+
 def toggle_blocked():
-    selected = tree.selection()
-    if not selected:
-        return
-    for item in selected:
-        values = tree.item(item, "values")
-        for c in contacts:
-            if c["name"] == values[0] and c["phone"] == values[1]:
-                c["status"] = "blocked" if c["status"] != "blocked" else "normal"
-                break
-    save_contacts()
-    refresh_table()
+    toggle_status("blocked")
+
+def show_status(status):
+    global view
+    refresh_table(store.filter(status))
+    view = status
 
 def show_favourites():
-    filtered = [c for c in contacts if c["status"] == "favourite"]
-    refresh_table(filtered)
+    show_status("favourite")
 
 def show_blocked():
-    filtered = [c for c in contacts if c["status"] == "blocked"]
-    refresh_table(filtered)
+    show_status("blocked")
 
 # --------- Main Contact Book UI ---------
 def show_contact_book():
-    global name_var, phone_var, email_var, search_var, tree
+    global name_var, phone_var, email_var, search_var, tree, shown
+    global pipeline, search_info
     global input_frame, table_frame, btn_frame, search_frame, welcome_frame
 
     ctk.set_appearance_mode("System")
@@ -184,8 +329,11 @@ def show_contact_book():
     main_menu.add_command(label="⭐ Favourites", command=show_favourites)
     main_menu.add_command(label="🚫 Blocked Contacts", command=show_blocked)
     main_menu.add_command(label="🔄 Show All", command=refresh_table)
+    main_menu.add_command(label="📥 Import Contacts", command=lambda: import_contacts(root))
+    main_menu.add_command(label="📤 Export Contacts", command=export_contacts)
     main_menu.add_separator()
-    main_menu.add_command(label="❌ Exit", command=root.quit)
+    main_menu.add_command(label="❌ Exit", command=lambda: exit_app(root))
+    root.protocol("WM_DELETE_WINDOW", lambda: exit_app(root))
 
     name_var = tk.StringVar()
     phone_var = tk.StringVar()
@@ -210,17 +358,24 @@ def show_contact_book():
     ctk.CTkLabel(search_frame, text="Search:").pack(side="left", padx=5)
     ctk.CTkEntry(search_frame, textvariable=search_var, width=250).pack(side="left")
     ctk.CTkButton(search_frame, text="🔍", command=search_contact).pack(side="left", padx=5)
+    search_info = ctk.CTkLabel(search_frame, text="")
+    search_info.pack(side="left", padx=5)
+    pipeline = SearchPipeline(root, session, refresh_table, report=report_search)
 
     table_frame = ctk.CTkFrame(root)
     tree_scroll = tk.Scrollbar(table_frame)
     tree_scroll.pack(side="right", fill="y")
 
-    tree = ttk.Treeview(table_frame, columns=("Name", "Phone", "Email", "Status"), show="headings", yscrollcommand=tree_scroll.set)
+    if VIRTUAL:
+        tree = VirtualTree(table_frame, tree_scroll, row_values, columns=("Name", "Phone", "Email", "Status"), show="headings")
+    else:
+        tree = ttk.Treeview(table_frame, columns=("Name", "Phone", "Email", "Status"), show="headings", yscrollcommand=tree_scroll.set)
+        tree_scroll.config(command=tree.yview)
+        shown = {}
     for col in ("Name", "Phone", "Email", "Status"):
         tree.heading(col, text=col)
         tree.column(col, anchor="center")
     tree.pack(fill="both", expand=True)
-    tree_scroll.config(command=tree.yview)
 
     btn_frame = ctk.CTkFrame(root)
     ctk.CTkButton(btn_frame, text="Edit Contact", command=edit_contact, width=140).grid(row=0, column=0, padx=10)
@@ -245,36 +400,60 @@ def show_contact_book():
             btn_frame.pack(pady=10)
             refresh_table()
 
-    contacts.clear()
-    contacts.extend(load_contacts())
     refresh_table()
+    start_loading(root)
+    root.after(WATCH_MS, watch_contacts, root)
     search_var.trace_add("write", lambda *args: search_contact())
 
     show_only("welcome")
     root.mainloop()
+    try:
+        store.close()
+    except OSError:
+        pass   # exit_app already asked, and the user chose to quit anyway
 
 # --------- Login Screen ---------
 def login_screen():
+    # password hashing takes a moment, so both checks run off the Tk thread
     def login():
         u = username.get()
         p = password.get()
-        if check_user(u, p):
-            login_win.destroy()
-            global current_user, contacts_file
-            current_user = u
-            contacts_file = f"{u}.json"
-            show_contact_book()
-        else:
-            messagebox.showerror("Error", "Invalid login!")
+        login_button.configure(state="disabled")
+
+        def done(ok, error=None):
+            if ok:
+                login_win.destroy()
+                global current_user, contacts_file
+                current_user = u
+                contacts_file = data_dir.user_book(u)
+                show_contact_book()
+                return
+            login_button.configure(state="normal")
+            if error is not None:
+                messagebox.showerror("Error", f"Could not check login: {error}")
+            else:
+                messagebox.showerror("Error", "Invalid login!")
+
+        run_in_background(login_win, lambda: check_user(u, p), done)
 
     def signup():
         u = username.get()
         p = password.get()
-        if u and p:
-            save_user(u, p)
-            messagebox.showinfo("Success", "Account created. Now log in.")
-        else:
+        if not (u and p):
             messagebox.showerror("Error", "Username and Password required.")
+            return
+        signup_button.configure(state="disabled")
+
+        def done(ok, error=None):
+            signup_button.configure(state="normal")
+            if error is not None:
+                messagebox.showerror("Error", f"Could not create account: {error}")
+            elif ok:
+                messagebox.showinfo("Success", "Account created. Now log in.")
+            else:
+                messagebox.showerror("Error", "Username already exists!")
+
+        run_in_background(login_win, lambda: save_user(u, p), done)
 
     login_win = ctk.CTk()
     login_win.title("Login")
@@ -300,8 +479,10 @@ def login_screen():
     ctk.CTkEntry(frame, textvariable=username).pack()
     ctk.CTkLabel(frame, text="Password").pack(pady=5)
     ctk.CTkEntry(frame, textvariable=password, show="*").pack()
-    ctk.CTkButton(frame, text="Login", command=login).pack(pady=10)
-    ctk.CTkButton(frame, text="Sign Up", command=signup).pack()
+    login_button = ctk.CTkButton(frame, text="Login", command=login)
+    login_button.pack(pady=10)
+    signup_button = ctk.CTkButton(frame, text="Sign Up", command=signup)
+    signup_button.pack()
 
     login_win.mainloop()
 
@@ -326,4 +507,7 @@ def unlock_app():
     pwd_win.mainloop()
 
 # --------- App Start ---------
-unlock_app()
+# guarded so the import worker processes don't start the app again
+if __name__ == "__main__":
+    data_dir.migrate()   # move a flat install into data/ before anything is read
+    unlock_app()
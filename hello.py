@@ -2,70 +2,48 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import messagebox, ttk, simpledialog
 from PIL import Image, ImageTk
-import json, os
+import data_dir
+from contact_store import ContactStore, ContactError
+from user_registry import UserRegistry
+from background_loader import run_in_background
 
 # Global Variables
-USER_FILE = "users.json"
-contacts = []
+USER_FILE = data_dir.users_file()  # data/users.json; see data_dir.py
+users = UserRegistry(USER_FILE)  # signups go to users.json.log
+JOURNAL = True  # append mutations to {user}.json.log instead of rewriting the file
+store = ContactStore(storage="journal" if JOURNAL else "json")
 current_user = None
 contacts_file = None
 
 # --------- Contact Functions ---------
 def load_contacts():
-    if os.path.exists(contacts_file):
-        with open(contacts_file, "r") as f:
-            try:
-                raw_contacts = json.load(f)
-                return [
-                    {
-                        "name": c["name"],
-                        "phone": c["phone"],
-                        "email": c.get("email", ""),
-                        "status": c.get("status", "normal")
-                    }
-                    for c in raw_contacts
-                ]
-            except json.JSONDecodeError:
-                return []
-    return []
+    store.open(contacts_file)
+    try:
+        store.load()
+    except (ValueError, OSError) as e:
+        # a book that doesn't parse is left alone on disk, not loaded as empty
+        messagebox.showerror("Error", f"Could not load contacts: {e}")
+    return store
 
 def save_contacts():
-    with open(contacts_file, "w") as f:
-        json.dump(contacts, f, indent=4)
+    store.save()
 
 # --------- User Functions ---------
 def save_user(username, password):
-    if not os.path.exists(USER_FILE):
-        with open(USER_FILE, "w") as f:
-            json.dump({}, f)
-    with open(USER_FILE, "r") as f:
-        users = json.load(f)
-    if username in users:
-        messagebox.showerror("Error", "Username already exists!")
-        return
-    users[username] = password
-    with open(USER_FILE, "w") as f:
-        json.dump(users, f, indent=4)
+    # False if the name is taken
+    return users.add(username, password)
 
 def check_user(username, password):
-    if not os.path.exists(USER_FILE):
-        return False
-    with open(USER_FILE, "r") as f:
-        users = json.load(f)
-    return users.get(username) == password
+    return users.check(username, password)
 
 # --------- Contact Management ---------
 def add_contact():
     name, phone, email = name_var.get(), phone_var.get(), email_var.get()
-    if not name or not phone:
-        messagebox.showerror("Error", "Name and Phone are required!")
+    try:
+        store.add(name, phone, email)
+    except ContactError as e:
+        messagebox.showerror("Error", str(e))
         return
-    for c in contacts:
-        if c["phone"] == phone:
-            messagebox.showerror("Error", "Contact already exists!")
-            return
-    contacts.append({"name": name, "phone": phone, "email": email, "status": "normal"})
-    save_contacts()
     refresh_table()
     name_var.set("")
     phone_var.set("")
@@ -73,11 +51,7 @@ def add_contact():
     messagebox.showinfo("Success", "Contact added!")
 
 def delete_contact():
-    selected = tree.selection()
-    for item in selected:
-        values = tree.item(item, "values")
-        contacts[:] = [c for c in contacts if not (c["name"] == values[0] and c["phone"] == values[1])]
-    save_contacts()
+    store.delete(tree.selection())
     refresh_table()
 
 def edit_contact():
@@ -85,42 +59,36 @@ def edit_contact():
     if not selected:
         return
     item = selected[0]
-    values = tree.item(item, "values")
-    for i, c in enumerate(contacts):
-        if c["name"] == values[0] and c["phone"] == values[1]:
-            name = simpledialog.askstring("Edit", "New name:", initialvalue=c["name"])
-            phone = simpledialog.askstring("Edit", "New phone:", initialvalue=c["phone"])
-            email = simpledialog.askstring("Edit", "New email:", initialvalue=c["email"])
-            if name and phone:
-                contacts[i] = {"name": name, "phone": phone, "email": email, "status": c["status"]}
-                break
-    save_contacts()
+    c = store.get(item)
+    if c is None:
+        return
+    name = simpledialog.askstring("Edit", "New name:", initialvalue=c.name)
+    phone = simpledialog.askstring("Edit", "New phone:", initialvalue=c.phone)
+    email = simpledialog.askstring("Edit", "New email:", initialvalue=c.email)
+    if not name or not phone:
+        return
+    try:
+        store.edit(item, name, phone, email)
+    except ContactError as e:
+        messagebox.showerror("Error", str(e))
+        return
     refresh_table()
 
 def toggle_status(status_type):
-    selected = tree.selection()
-    for item in selected:
-        values = tree.item(item, "values")
-        for c in contacts:
-            if c["name"] == values[0] and c["phone"] == values[1]:
-                c["status"] = status_type if c["status"] != status_type else "normal"
-                break
-    save_contacts()
+    store.toggle_status(tree.selection(), status_type)
     refresh_table()
 
 def show_filtered_contacts(status_type):
-    filtered = [c for c in contacts if c["status"] == status_type]
-    refresh_table(filtered)
+    refresh_table(store.filter(status_type))
 
 def refresh_table(filtered=None):
     tree.delete(*tree.get_children())
-    for c in (filtered if filtered is not None else contacts):
-        tree.insert("", "end", values=(c["name"], c["phone"], c["email"], c["status"]))
+    for iid, c in (filtered if filtered is not None else store.items()):
+        tree.insert("", "end", iid=iid, values=(c.name, c.phone, c.email, c.status))
 
 def search_contact(*args):
     term = search_var.get().lower()
-    filtered = [c for c in contacts if term in c["name"].lower() or term in c["phone"]]
-    refresh_table(filtered)
+    refresh_table(store.search(term))
 
 # --------- Contact Book UI ---------
 def show_contact_book():
@@ -213,8 +181,7 @@ def show_contact_book():
             btn_frame.pack(pady=5)
 
     # Init data
-    contacts.clear()
-    contacts.extend(load_contacts())
+    load_contacts()
     refresh_table()
     search_var.trace_add("write", search_contact)
     show_only("welcome")
@@ -222,24 +189,44 @@ def show_contact_book():
 
 # --------- App Entry + Login ---------
 def login_screen():
+    # password hashing takes a moment, so both checks run off the Tk thread
     def login():
         u, p = username.get(), password.get()
-        if check_user(u, p):
-            login_win.destroy()
-            global current_user, contacts_file
-            current_user = u
-            contacts_file = f"{u}.json"
-            unlock_app()
-        else:
-            messagebox.showerror("Error", "Invalid credentials!")
+        login_button.configure(state="disabled")
+
+        def done(ok, error=None):
+            if ok:
+                login_win.destroy()
+                global current_user, contacts_file
+                current_user = u
+                contacts_file = data_dir.user_book(u)
+                unlock_app()
+                return
+            login_button.configure(state="normal")
+            if error is not None:
+                messagebox.showerror("Error", f"Could not check login: {error}")
+            else:
+                messagebox.showerror("Error", "Invalid credentials!")
+
+        run_in_background(login_win, lambda: check_user(u, p), done)
 
     def signup():
         u, p = username.get(), password.get()
-        if u and p:
-            save_user(u, p)
-            messagebox.showinfo("Success", "Account created.")
-        else:
+        if not (u and p):
             messagebox.showerror("Error", "All fields required.")
+            return
+        signup_button.configure(state="disabled")
+
+        def done(ok, error=None):
+            signup_button.configure(state="normal")
+            if error is not None:
+                messagebox.showerror("Error", f"Could not create account: {error}")
+            elif ok:
+                messagebox.showinfo("Success", "Account created.")
+            else:
+                messagebox.showerror("Error", "Username already exists!")
+
+        run_in_background(login_win, lambda: save_user(u, p), done)
 
     login_win = ctk.CTk()
     login_win.title("Login")
@@ -261,8 +248,10 @@ def login_screen():
     ctk.CTkLabel(frame, text="Password").pack()
     ctk.CTkEntry(frame, textvariable=password, show="*").pack()
 
-    ctk.CTkButton(frame, text="Login", command=login).pack(pady=10)
-    ctk.CTkButton(frame, text="Sign Up", command=signup).pack()
+    login_button = ctk.CTkButton(frame, text="Login", command=login)
+    login_button.pack(pady=10)
+    signup_button = ctk.CTkButton(frame, text="Sign Up", command=signup)
+    signup_button.pack()
 
     login_win.mainloop()
 
@@ -287,4 +276,5 @@ def unlock_app():
     pwd_win.mainloop()
 
 # Start App
+data_dir.migrate()   # move a flat install into data/ before anything is read
 login_screen()
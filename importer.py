@@ -0,0 +1,176 @@
+import csv, io, multiprocessing, os, re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Bulk import of phone exports (CSV or vCard) into a ContactStore.
+# Files are read as a stream of chunks of whole records; big files have
+# their chunks parsed by a process pool, a few chunks in flight at a time,
+# and the results come back in file order. Rows without a name or phone
+# and phones already in the book (or earlier in the file) are skipped,
+# the same rule add_contact enforces, and everything left is committed
+# as one batch, i.e. one write.
+#
+# The pool's processes are spawned, not forked: iter_chunks runs on a
+# BackgroundLoader thread, and a fork taken there would copy whatever
+# locks the Tk thread held at that moment into the children.
+
+CHUNK = 5000                       # records per chunk
+PARALLEL_BYTES = 4 * 1024 * 1024   # smaller files are parsed in-process
+
+NAME_FIELDS = ("name", "full name", "display name", "fn")
+FIRST_FIELDS = ("first name", "given name")
+LAST_FIELDS = ("last name", "family name", "surname")
+PHONE_FIELDS = ("phone", "mobile", "mobile phone", "phone number", "tel", "telephone",
+                "primary phone", "phone 1 - value")
+EMAIL_FIELDS = ("email", "e-mail", "email address", "e-mail address", "e-mail 1 - value")
+
+def kind_of(path):
+    ext = os.path.splitext(path)[1].lower()
+    return "vcard" if ext in (".vcf", ".vcard") else "csv"
+
+# --------- Chunking (main process) ---------
+def csv_chunks(f):
+    header = f.readline()
+    lines, records, quoted = [], 0, False
+    for line in f:
+        lines.append(line)
+        # a quoted field can hold newlines; only cut between records
+        if line.count('"') % 2:
+            quoted = not quoted
+        if not quoted:
+            records += 1
+            if records >= CHUNK:
+                yield header, "".join(lines)
+                lines, records = [], 0
+    if lines:
+        yield header, "".join(lines)
+
+def vcard_chunks(f):
+    lines, cards = [], 0
+    for line in f:
+        lines.append(line)
+        if line.strip().upper() == "END:VCARD":
+            cards += 1
+            if cards >= CHUNK:
+                yield "", "".join(lines)
+                lines, cards = [], 0
+    if lines:
+        yield "", "".join(lines)
+
+# --------- Parsing (worker processes) ---------
+def pick(header, names, fallback=None):
+    for i, field in enumerate(header):
+        if field in names:
+            return i
+    if fallback:
+        for i, field in enumerate(header):
+            if fallback in field:
+                return i
+    return None
+
+def parse_csv(header, text):
+    reader = csv.reader(io.StringIO(header + text))
+    fields = [h.strip().lower() for h in next(reader, [])]
+    name = pick(fields, NAME_FIELDS)
+    first, last = pick(fields, FIRST_FIELDS), pick(fields, LAST_FIELDS)
+    phone = pick(fields, PHONE_FIELDS, "phone")
+    if phone is None:
+        phone = pick(fields, (), "mobile")
+    email = pick(fields, EMAIL_FIELDS, "mail")
+
+    def cell(row, i):
+        return row[i].strip() if i is not None and i < len(row) else ""
+
+    records = []
+    for row in reader:
+        n = cell(row, name) or " ".join(p for p in (cell(row, first), cell(row, last)) if p)
+        records.append((n, cell(row, phone), cell(row, email)))
+    return records
+
+def unescape(value):
+    return value.replace("\\n", " ").replace("\\N", " ").replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\")
+
+def parse_vcard(header, text):
+    text = re.sub(r"\r?\n[ \t]", "", text)   # unfold continuation lines
+    records, card = [], None
+    for line in text.splitlines():
+        key, _, value = line.partition(":")
+        prop = key.split(";")[0].split(".")[-1].upper()   # "item1.TEL;TYPE=CELL" -> "TEL"
+        if prop == "BEGIN":
+            card = {}
+        elif card is None:
+            continue
+        elif prop == "END":
+            name = card.get("FN") or card.get("N", "")
+            records.append((name, card.get("TEL", ""), card.get("EMAIL", "")))
+            card = None
+        elif prop in ("FN", "TEL", "EMAIL") and prop not in card:
+            card[prop] = unescape(value).strip()
+        elif prop == "N" and "N" not in card:
+            # N:Family;Given;Middle;Prefix;Suffix
+            parts = [unescape(p).strip() for p in value.split(";")]
+            card["N"] = " ".join(p for p in parts[1:2] + parts[:1] if p)
+    return records
+
+PARSERS = {"csv": (csv_chunks, parse_csv), "vcard": (vcard_chunks, parse_vcard)}
+
+def parse(kind, header, text):
+    return PARSERS[kind][1](header, text)
+
+# --------- Reading ---------
+def iter_chunks(path, workers=None):
+    # yields ("records", [(name, phone, email), ...], progress), the same
+    # shape BackgroundLoader feeds to its on_chunk callback
+    kind = kind_of(path)
+    split = PARSERS[kind][0]
+    size = max(1, os.path.getsize(path))
+    workers = workers or os.cpu_count() or 1
+    parallel = workers > 1 and size >= PARALLEL_BYTES
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        if not parallel:
+            done = 0
+            for header, text in split(f):
+                done += len(text)
+                yield "records", parse(kind, header, text), min(1.0, done / size)
+            return
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            inflight, done = deque(), 0
+            limit = 2 * workers
+            for header, text in split(f):
+                inflight.append((pool.submit(parse, kind, header, text), len(text)))
+                if len(inflight) >= limit:
+                    future, length = inflight.popleft()
+                    done += length
+                    yield "records", future.result(), min(1.0, done / size)
+            while inflight:
+                future, length = inflight.popleft()
+                done += length
+                yield "records", future.result(), min(1.0, done / size)
+
+# --------- Importing ---------
+class Import:
+    def __init__(self, store):
+        self.store = store
+        self.batch = store.batch()
+        self.seen = set()
+        self.counts = {"added": 0, "duplicates": 0, "invalid": 0}
+
+    def feed(self, records):
+        for name, phone, email in records:
+            if not name or not phone:
+                self.counts["invalid"] += 1
+            elif phone in self.seen or self.store.has_phone(phone):
+                self.counts["duplicates"] += 1
+            else:
+                self.seen.add(phone)
+                self.batch.add(name, phone, email)
+
+    def commit(self):
+        self.counts["added"] = self.batch.commit()
+        return self.counts
+
+def import_file(store, path, workers=None):
+    job = Import(store)
+    for _, records, _ in iter_chunks(path, workers):
+        job.feed(records)
+    return job.commit()
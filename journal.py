@@ -0,0 +1,400 @@
+import json, os, threading
+import file_lock
+
+# Journaled storage: `{user}.json` stays the snapshot, every mutation is
+# appended as one JSON line to `{user}.json.log`, and once the log grows
+# past COMPACT_BYTES a background thread folds it into a new snapshot.
+#
+# Operations are keyed by phone and written so that replaying them twice
+# gives the same result (a crash mid-compaction can leave a log that was
+# already folded into the snapshot):
+#   {"op": "add", "contact": {...}}
+#   {"op": "edit", "phone": old_phone, "contact": {...}}
+#   {"op": "delete", "phone": phone}
+#   {"op": "status", "phone": phone, "status": "favourite"}
+# Several ops written together (a batch) share one line,
+#   {"op": "batch", "ops": [...]}
+# so an append torn by a crash leaves a line that doesn't parse and none
+# of the batch is replayed.
+
+LOG_SUFFIX = ".log"
+COMPACTING_SUFFIX = ".log.compacting"
+COMPACT_BYTES = 1024 * 1024
+FIRST_CHUNK = 100   # records in the first streamed chunk (one screenful)
+CHUNK = 2000
+BLOCK = 64 * 1024
+
+_compacting = set()
+
+# Several processes may open the same book. Writers (append, save and the
+# end of a compaction) hold the book's file lock; readers never lock.
+# Instead they note version(path) before reading and read again if a
+# compaction or full rewrite swapped the files in the meantime. A reader
+# also gets back a position, which is the version plus how far into the
+# log it read. read_since() hands a writer just the ops other processes
+# appended after that position, or None if it has to reload.
+
+# --------- Records ---------
+def normalize(c):
+    status = c.get("status", "normal")
+    if c.get("favourite"):
+        status = "favourite"
+    if c.get("blocked"):
+        status = "blocked"
+    return {
+        "name": c["name"],
+        "phone": c["phone"],
+        "email": c.get("email", "") or "",
+        "status": status
+    }
+
+def apply_op(contacts, positions, op):
+    kind = op.get("op")
+    if kind == "add":
+        contact = normalize(op["contact"])
+        i = positions.get(contact["phone"])
+        if i is None:
+            positions[contact["phone"]] = len(contacts)
+            contacts.append(contact)
+        else:
+            contacts[i] = contact
+    elif kind == "edit":
+        i = positions.pop(op["phone"], None)
+        contact = normalize(op["contact"])
+        if i is None:
+            i = positions.get(contact["phone"])
+            if i is None:
+                return
+        j = positions.get(contact["phone"])
+        if j is not None and j != i:
+            contacts[j] = None   # replayed over a snapshot that already has the edit
+        contacts[i] = contact
+        positions[contact["phone"]] = i
+    elif kind == "delete":
+        i = positions.pop(op["phone"], None)
+        if i is not None:
+            contacts[i] = None
+    elif kind == "status":
+        i = positions.get(op["phone"])
+        if i is not None:
+            contacts[i]["status"] = op["status"]
+
+# --------- Versions ---------
+def locked(path):
+    return file_lock.lock_for(path)
+
+def stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+def version(path):
+    # changes whenever the snapshot or .compacting is replaced or the log is
+    # started afresh; plain appends to the log leave it alone
+    log = stamp(path + LOG_SUFFIX)
+    return stamp(path), stamp(path + COMPACTING_SUFFIX), log and log[0]
+
+def position(path):
+    # call with the lock held, right after writing
+    log = stamp(path + LOG_SUFFIX)
+    return version(path), log[2] if log else 0
+
+def read_since(path, position):
+    # (ops appended since position, new position); (None, None) if the
+    # files were swapped since and the caller has to load() again. A
+    # compaction starting or finishing is followed without a reload: the log
+    # being read just moves to .compacting, or .compacting (already read)
+    # goes into the snapshot.
+    if position is None:
+        return None, None
+    (snapshot, compacting, log), offset = position
+    now = version(path)
+    if now == position[0]:
+        ops, offset = read_ops(path + LOG_SUFFIX, offset)
+    elif now[0] == snapshot and compacting is None and now[1] is not None and now[1][0] == log:
+        ops = read_ops(path + COMPACTING_SUFFIX, offset)[0]
+        more, offset = read_ops(path + LOG_SUFFIX)
+        ops += more
+    elif compacting is not None and now[1] is None and now[2] == log:
+        ops, offset = read_ops(path + LOG_SUFFIX, offset)
+    else:
+        return None, None
+    if version(path) != now:
+        return None, None   # swapped again while reading
+    return ops, (now, offset)
+
+# --------- Load ---------
+def read_snapshot(path):
+    # a snapshot that doesn't parse raises: treating it as empty would let
+    # the next compaction replace the whole book with just the log
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return [normalize(c) for c in json.load(f)]
+
+def read_ops(log, offset=0):
+    try:
+        f = open(log, "rb")
+    except FileNotFoundError:
+        return [], offset
+    with f:
+        return read_ops_file(f, offset)
+
+def read_ops_file(f, offset=0):
+    # complete lines from offset on; returns (ops, offset past the last one read)
+    f.seek(offset)
+    ops = []
+    for line in f:
+        if not line.endswith(b"\n"):
+            break   # still being written
+        offset += len(line)
+        try:
+            op = json.loads(line) if line.strip() else None
+        except ValueError:
+            continue   # torn by an interrupted append, which the next one ended
+        if op is None:
+            continue
+        if op.get("op") == "batch":
+            ops.extend(op["ops"])
+        else:
+            ops.append(op)
+    return ops, offset
+
+def load_at(path):
+    # load() plus the position it read up to; never takes the lock
+    while True:
+        before = version(path)
+        contacts = read_snapshot(path)
+        positions = {c["phone"]: i for i, c in enumerate(contacts)}
+        for op in read_ops(path + COMPACTING_SUFFIX)[0]:
+            apply_op(contacts, positions, op)
+        ops, offset = read_ops(path + LOG_SUFFIX)
+        for op in ops:
+            apply_op(contacts, positions, op)
+        if version(path) == before:
+            return [c for c in contacts if c is not None], (before, offset)
+
+def load(path):
+    return load_at(path)[0]
+
+# --------- Streaming load ---------
+def iter_json_array(f, counter=None):
+    # yields the elements of a top-level JSON array without reading it whole
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def more():
+        nonlocal buf, pos, eof
+        data = f.read(BLOCK)
+        if counter is not None:
+            counter[0] += len(data)
+        eof = not data
+        buf = buf[pos:] + data
+        pos = 0
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            more()
+
+    more()
+    skip(" \t\r\n")
+    if buf[pos:pos + 1] != "[":
+        raise json.JSONDecodeError("expected '['", buf, pos)
+    pos += 1
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buf):
+            raise json.JSONDecodeError("unterminated array", buf, pos)   # cut short
+        if buf[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more()
+            continue
+        if end == len(buf) and not eof:
+            more()  # a scalar cut off by the block boundary would parse short
+            continue
+        pos = end
+        yield item
+
+def open_files(path):
+    # (version, [snapshot, compacting, log]) handles, None for a missing
+    # file. All three are opened up front (again if a compaction swapped
+    # them meanwhile), so the open handles give one consistent view.
+    while True:
+        before = version(path)
+        files = [open(p, "r" if p == path else "rb") if os.path.exists(p) else None
+                 for p in (path, path + COMPACTING_SUFFIX, path + LOG_SUFFIX)]
+        if version(path) == before:
+            return before, files
+        close_files(files)
+
+def close_files(files):
+    for f in files:
+        if f is not None:
+            f.close()
+
+def iter_load(path):
+    # Streams load(path) as ("contacts", records, progress) chunks, then one
+    # ("ops", log_ops, 1.0) and a final ("position", position, 1.0).
+    before, files = open_files(path)
+    snapshot, compacting, log = files
+    try:
+        if snapshot is not None:
+            total = max(1, os.fstat(snapshot.fileno()).st_size)
+            counter = [0]
+            chunk, limit = [], FIRST_CHUNK
+            for c in iter_json_array(snapshot, counter):
+                chunk.append(normalize(c))
+                if len(chunk) >= limit:
+                    yield "contacts", chunk, min(1.0, counter[0] / total)
+                    chunk, limit = [], CHUNK
+            if chunk:
+                yield "contacts", chunk, 1.0
+        ops, offset = [], 0
+        if compacting is not None:
+            ops.extend(read_ops_file(compacting)[0])
+        if log is not None:
+            more, offset = read_ops_file(log)
+            ops.extend(more)
+        yield "ops", ops, 1.0
+        yield "position", (before, offset), 1.0
+    finally:
+        close_files(files)
+
+class Overlay(dict):
+    # the records the log touches, by position in the book; stands in for
+    # the contacts list in apply_op()
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def append(self, contact):
+        self[self.size] = contact
+        self.size += 1
+
+def iter_contacts(path):
+    # the records load(path) returns, one at a time: the log is read first,
+    # then the snapshot is streamed twice, once to find the records the log
+    # touches and once to yield them with the log applied
+    _, files = open_files(path)
+    snapshot, compacting, log = files
+    try:
+        ops = []
+        for f in (compacting, log):
+            if f is not None:
+                ops.extend(read_ops_file(f)[0])
+        touched = set()
+        for op in ops:
+            touched.add(op.get("phone"))
+            touched.add(op.get("contact", {}).get("phone"))
+        overlay, positions, size = Overlay(0), {}, 0
+        if snapshot is not None:
+            for i, c in enumerate(iter_json_array(snapshot)):
+                size = i + 1
+                if c["phone"] in touched:
+                    overlay[i] = normalize(c)
+                    positions[c["phone"]] = i
+        overlay.size = size
+        for op in ops:
+            apply_op(overlay, positions, op)
+        if snapshot is not None:
+            snapshot.seek(0)
+            for i, c in enumerate(iter_json_array(snapshot)):
+                c = overlay[i] if i in overlay else normalize(c)
+                if c is not None:
+                    yield c
+        for i in range(size, len(overlay)):
+            if overlay[i] is not None:
+                yield overlay[i]
+    finally:
+        close_files(files)
+
+# --------- Write ---------
+def write_tmp(path, contacts):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(contacts, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp
+
+def write_snapshot(path, contacts):
+    # readers see the old file or the new one, never half of either
+    os.replace(write_tmp(path, contacts), path)
+
+def append(path, *ops):
+    # one line for the lot, so a batch is replayed whole or not at all
+    if not ops:
+        return
+    line = json.dumps(ops[0] if len(ops) == 1 else {"op": "batch", "ops": list(ops)}) + "\n"
+    log = path + LOG_SUFFIX
+    with locked(path):
+        with open(log, "a+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    line = "\n" + line   # end a line torn by a crash first
+            f.write(line.encode("utf-8"))
+            size = f.tell()
+        if size >= COMPACT_BYTES:
+            start_compaction(path)
+
+def save(path, contacts):
+    # full rewrite; also discards any pending log
+    with locked(path):
+        write_snapshot(path, contacts)
+        for log in (path + COMPACTING_SUFFIX, path + LOG_SUFFIX):
+            if os.path.exists(log):
+                os.remove(log)
+
+# --------- Compaction ---------
+def start_compaction(path):
+    with locked(path):
+        if path in _compacting:
+            return
+        # a leftover .compacting log (interrupted run, or another process's
+        # compaction still going) is folded in first
+        if not os.path.exists(path + COMPACTING_SUFFIX):
+            if not os.path.exists(path + LOG_SUFFIX):
+                return
+            # new appends go to a fresh log while this one is folded in
+            os.replace(path + LOG_SUFFIX, path + COMPACTING_SUFFIX)
+        _compacting.add(path)
+    threading.Thread(target=compact, args=(path,), daemon=True).start()
+
+def compact(path):
+    # folds without the lock and only swaps the result in if nobody else
+    # replaced the snapshot or .compacting meanwhile
+    tmp = None
+    try:
+        before = stamp(path), stamp(path + COMPACTING_SUFFIX)
+        contacts = read_snapshot(path)
+        positions = {c["phone"]: i for i, c in enumerate(contacts)}
+        for op in read_ops(path + COMPACTING_SUFFIX)[0]:
+            apply_op(contacts, positions, op)
+        tmp = write_tmp(path, [c for c in contacts if c is not None])
+        with locked(path):
+            if before[1] is not None and (stamp(path), stamp(path + COMPACTING_SUFFIX)) == before:
+                os.replace(tmp, path)
+                tmp = None
+                os.remove(path + COMPACTING_SUFFIX)
+    finally:
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+        with locked(path):
+            _compacting.discard(path)
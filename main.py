@@ -1,21 +1,18 @@
 import tkinter as tk
 from tkinter import messagebox, ttk, simpledialog
-import json, os
+from contact_store import ContactStore, ContactError
 
 # File path
 FILE = "contacts.json"
+store = ContactStore(FILE, storage="json")
 
 # Load contacts
 def load_contacts():
-    if os.path.exists(FILE):
-        with open(FILE, "r") as f:
-            return json.load(f)
-    return []
+    return store.load()
 
 # Save contacts
 def save_contacts():
-    with open(FILE, "w") as f:
-        json.dump(contacts, f)
+    store.save()
 
 # Add new contact
 def add_contact():
@@ -24,9 +21,11 @@ def add_contact():
     email = email_var.get().strip()
 
     if name and phone:
-        contact = {"name": name, "phone": phone, "email": email}
-        contacts.append(contact)
-        save_contacts()
+        try:
+            store.add(name, phone, email)
+        except ContactError as e:
+            messagebox.showwarning("Duplicate", str(e))
+            return
         refresh_table()
         clear_fields()
     else:
@@ -42,9 +41,7 @@ def clear_fields():
 def delete_contact():
     selected = tree.selection()
     if selected:
-        idx = tree.index(selected)
-        contacts.pop(idx)
-        save_contacts()
+        store.delete(selected)
         refresh_table()
     else:
         messagebox.showinfo("Select", "Select a contact to delete.")
@@ -53,26 +50,28 @@ def delete_contact():
 def edit_contact():
     selected = tree.selection()
     if selected:
-        idx = tree.index(selected)
-        contact = contacts[idx]
+        contact = store.get(selected[0])
 
-        new_name = simpledialog.askstring("Edit Name", "Name:", initialvalue=contact["name"])
-        new_phone = simpledialog.askstring("Edit Phone", "Phone:", initialvalue=contact["phone"])
-        new_email = simpledialog.askstring("Edit Email", "Email:", initialvalue=contact["email"])
+        new_name = simpledialog.askstring("Edit Name", "Name:", initialvalue=contact.name)
+        new_phone = simpledialog.askstring("Edit Phone", "Phone:", initialvalue=contact.phone)
+        new_email = simpledialog.askstring("Edit Email", "Email:", initialvalue=contact.email)
 
         if new_name and new_phone:
-            contacts[idx] = {"name": new_name, "phone": new_phone, "email": new_email or ""}
-            save_contacts()
+            try:
+                store.edit(selected[0], new_name, new_phone, new_email or "")
+            except ContactError as e:
+                messagebox.showwarning("Duplicate", str(e))
+                return
             refresh_table()
         else:
             messagebox.showwarning("Required", "Name and Phone can't be empty.")
 
 # Refresh table
-def refresh_table():
+def refresh_table(filtered=None):
     for row in tree.get_children():
         tree.delete(row)
-    for contact in contacts:
-        tree.insert("", tk.END, values=(contact["name"], contact["phone"], contact["email"]))
+    for iid, contact in (filtered if filtered is not None else store.items()):
+        tree.insert("", tk.END, iid=iid, values=(contact.name, contact.phone, contact.email))
 
 # GUI
 root = tk.Tk()
@@ -113,7 +112,7 @@ tk.Button(btn_frame, text="Edit", width=15, command=edit_contact).grid(row=0, co
 tk.Button(btn_frame, text="Delete", width=15, command=delete_contact).grid(row=0, column=1, padx=5)
 
 # Load and show
-contacts = load_contacts()
+load_contacts()
 refresh_table()
 
 root.mainloop()
\ No newline at end of file
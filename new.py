@@ -1,82 +1,47 @@
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import messagebox, ttk, simpledialog
-from PIL import Image, ImageTk
-import json, os
-
-USER_FILE = "users.json"
-contacts = []
+import data_dir
+from contact_store import ContactStore, ContactError
+from user_registry import UserRegistry
+from background_loader import run_in_background
+
+USER_FILE = data_dir.users_file()  # data/users.json; see data_dir.py
+users = UserRegistry(USER_FILE)  # signups go to users.json.log
+JOURNAL = True  # append mutations to {user}.json.log instead of rewriting the file
+store = ContactStore(storage="journal" if JOURNAL else "json")
 current_user = None
 contacts_file = None
 
 # --------- Contact Book Functions ---------
 def load_contacts():
-    global contacts_file
-    if os.path.exists(contacts_file):
-        with open(contacts_file, "r") as f:
-            raw_contacts = json.load(f)
-            fixed_contacts = []
-            for c in raw_contacts:
-                status = c.get("status", "normal")
-                if c.get("favourite"):
-                    status = "favourite"
-                if c.get("blocked"):
-                    status = "blocked"
-                fixed_contacts.append({
-                    "name": c["name"],
-                    "phone": c["phone"],
-                    "email": c.get("email", ""),
-                    "status": status
-                })
-            return fixed_contacts
-    return []
+    store.open(contacts_file)
+    try:
+        store.load()
+    except (ValueError, OSError) as e:
+        # a book that doesn't parse is left alone on disk, not loaded as empty
+        messagebox.showerror("Error", f"Could not load contacts: {e}")
+    return store
 
 def save_contacts():
-    global contacts_file
-    with open(contacts_file, "w") as f:
-        json.dump(contacts, f, indent=4)
+    store.save()
 
 # --------- User Login/Signup Functions ---------
 def save_user(username, password):
-    users = {}
-    if not os.path.exists(USER_FILE):
-        with open(USER_FILE, "w") as f:
-            json.dump({}, f)
-    try:
-        with open(USER_FILE, "r") as f:
-            users = json.load(f)
-    except json.JSONDecodeError:
-        users = {}
-    if username in users:
-        messagebox.showerror("Error", "Username already exists!")
-        return
-    users[username] = password
-    with open(USER_FILE, "w") as f:
-        json.dump(users, f, indent=4)
+    # False if the name is taken
+    return users.add(username, password)
 
 def check_user(username, password):
-    if not os.path.exists(USER_FILE):
-        return False
-    try:
-        with open(USER_FILE, "r") as f:
-            users = json.load(f)
-        return users.get(username) == password
-    except json.JSONDecodeError:
-        return False
+    return users.check(username, password)
 
 # --------- Contact Management Functions ---------
 def add_contact():
     name, phone, email = name_var.get(), phone_var.get(), email_var.get()
-    if not name or not phone:
-        messagebox.showerror("Error", "Name and Phone are required!")
+    try:
+        store.add(name, phone, email)
+    except ContactError as e:
+        messagebox.showerror("Error", str(e))
         return
-    for c in contacts:
-        if c["phone"] == phone:
-            messagebox.showerror("Error", "Contact already exists!")
-            return
-    contact = {"name": name, "phone": phone, "email": email, "status": "normal"}
-    contacts.append(contact)
-    save_contacts()
     refresh_table()
     clear_fields()
     messagebox.showinfo("Success", "Contact added!")
@@ -85,13 +50,7 @@ def delete_contact():
     selected = tree.selection()
     if not selected:
         return
-    for item in selected:
-        values = tree.item(item, "values")
-        for c in contacts:
-            if c["name"] == values[0] and c["phone"] == values[1]:
-                contacts.remove(c)
-                break
-    save_contacts()
+    store.delete(selected)
     refresh_table()
 
 def edit_contact():
@@ -99,30 +58,33 @@ def edit_contact():
     if not selected:
         return
     item = selected[0]
-    values = tree.item(item, "values")
-    for i, c in enumerate(contacts):
-        if c["name"] == values[0] and c["phone"] == values[1]:
-            name = simpledialog.askstring("Edit", "Enter new name:", initialvalue=c["name"])
-            phone = simpledialog.askstring("Edit", "Enter new phone:", initialvalue=c["phone"])
-            email = simpledialog.askstring("Edit", "Enter new email:", initialvalue=c["email"])
-            if name and phone:
-                contacts[i] = {"name": name, "phone": phone, "email": email, "status": c["status"]}
-                break
-    save_contacts()
+    c = store.get(item)
+    if c is None:
+        return
+    name = simpledialog.askstring("Edit", "Enter new name:", initialvalue=c.name)
+    phone = simpledialog.askstring("Edit", "Enter new phone:", initialvalue=c.phone)
+    email = simpledialog.askstring("Edit", "Enter new email:", initialvalue=c.email)
+    if not name or not phone:
+        return
+    try:
+        store.edit(item, name, phone, email)
+    except ContactError as e:
+        messagebox.showerror("Error", str(e))
+        return
     refresh_table()
 
 def refresh_table(filtered=None):
     tree.delete(*tree.get_children())
-    data = filtered if filtered is not None else contacts
-    for contact in data:
-        status_text = contact["status"]
+    data = filtered if filtered is not None else store.items()
+    for iid, contact in data:
+        status_text = contact.status
         emoji = "🙂"
         if status_text == "favourite":
             emoji = "⭐"
         elif status_text == "blocked":
             emoji = "🚫"
         display_status = f"{emoji} {status_text.capitalize()}"
-        tree.insert("", "end", values=(contact["name"], contact["phone"], contact["email"], display_status))
+        tree.insert("", "end", iid=iid, values=(contact.name, contact.phone, contact.email, display_status))
 
 def clear_fields():
     name_var.set("")
@@ -131,42 +93,27 @@ def clear_fields():
 
 def search_contact():
     term = search_var.get().lower()
-    filtered = [c for c in contacts if term in c["name"].lower() or term in c["phone"]]
-    refresh_table(filtered)
+    refresh_table(store.search(term))
 
 def toggle_favourite():
     selected = tree.selection()
     if not selected:
         return
-    for item in selected:
-        values = tree.item(item, "values")
-        for c in contacts:
-            if c["name"] == values[0] and c["phone"] == values[1]:
-                c["status"] = "favourite" if c["status"] != "favourite" else "normal"
-                break
-    save_contacts()
+    store.toggle_status(selected, "favourite")
     refresh_table()
 
 def toggle_blocked():
     selected = tree.selection()
     if not selected:
         return
-    for item in selected:
-        values = tree.item(item, "values")
-        for c in contacts:
-            if c["name"] == values[0] and c["phone"] == values[1]:
-                c["status"] = "blocked" if c["status"] != "blocked" else "normal"
-                break
-    save_contacts()
+    store.toggle_status(selected, "blocked")
     refresh_table()
 
 def show_favourites():
-    filtered = [c for c in contacts if c["status"] == "favourite"]
-    refresh_table(filtered)
+    refresh_table(store.filter("favourite"))
 
 def show_blocked():
-    filtered = [c for c in contacts if c["status"] == "blocked"]
-    refresh_table(filtered)
+    refresh_table(store.filter("blocked"))
 
 # --------- Main Contact Book UI ---------
 def show_contact_book():
@@ -250,8 +197,7 @@ def show_contact_book():
             btn_frame.pack(pady=10)
             refresh_table()
 
-    contacts.clear()
-    contacts.extend(load_contacts())
+    load_contacts()
     refresh_table()
     search_var.trace_add("write", lambda *args: search_contact())
 
@@ -260,26 +206,46 @@ def show_contact_book():
 
 # --------- Login Screen ---------
 def login_screen():
+    # password hashing takes a moment, so both checks run off the Tk thread
     def login():
         u = username.get()
         p = password.get()
-        if check_user(u, p):
-            login_win.destroy()
-            global current_user, contacts_file
-            current_user = u
-            contacts_file = f"{u}.json"
-            show_contact_book()
-        else:
-            messagebox.showerror("Error", "Invalid login!")
+        login_button.configure(state="disabled")
+
+        def done(ok, error=None):
+            if ok:
+                login_win.destroy()
+                global current_user, contacts_file
+                current_user = u
+                contacts_file = data_dir.user_book(u)
+                show_contact_book()
+                return
+            login_button.configure(state="normal")
+            if error is not None:
+                messagebox.showerror("Error", f"Could not check login: {error}")
+            else:
+                messagebox.showerror("Error", "Invalid login!")
+
+        run_in_background(login_win, lambda: check_user(u, p), done)
 
     def signup():
         u = username.get()
         p = password.get()
-        if u and p:
-            save_user(u, p)
-            messagebox.showinfo("Success", "Account created. Now log in.")
-        else:
+        if not (u and p):
             messagebox.showerror("Error", "Username and Password required.")
+            return
+        signup_button.configure(state="disabled")
+
+        def done(ok, error=None):
+            signup_button.configure(state="normal")
+            if error is not None:
+                messagebox.showerror("Error", f"Could not create account: {error}")
+            elif ok:
+                messagebox.showinfo("Success", "Account created. Now log in.")
+            else:
+                messagebox.showerror("Error", "Username already exists!")
+
+        run_in_background(login_win, lambda: save_user(u, p), done)
 
     login_win = ctk.CTk()
     login_win.title("Login")
@@ -295,8 +261,10 @@ def login_screen():
     ctk.CTkEntry(frame, textvariable=username).pack()
     ctk.CTkLabel(frame, text="Password").pack(pady=5)
     ctk.CTkEntry(frame, textvariable=password, show="*").pack()
-    ctk.CTkButton(frame, text="Login", command=login).pack(pady=10)
-    ctk.CTkButton(frame, text="Sign Up", command=signup).pack()
+    login_button = ctk.CTkButton(frame, text="Login", command=login)
+    login_button.pack(pady=10)
+    signup_button = ctk.CTkButton(frame, text="Sign Up", command=signup)
+    signup_button.pack()
 
     login_win.mainloop()
 
@@ -321,4 +289,5 @@ def unlock_app():
     pwd_win.mainloop()
 
 # --------- Launch App ---------
+data_dir.migrate()   # move a flat install into data/ before anything is read
 unlock_app()
@@ -0,0 +1,104 @@
+import queue, threading, time
+from collections import deque
+
+# Runs search-as-you-type off the Tk thread. Keystrokes are debounced, the
+# match runs on a single worker thread, and results come back through a
+# queue that the mainloop polls with after() until the newest search has
+# answered. A newer keystroke cancels whatever is still queued or running,
+# so only the latest term renders. The session should be built with the
+# lock the book is changed under (see search_session.py).
+#
+# Each render records the keystroke-to-render latency, the same latency
+# minus the debounce delay, and how long the render itself blocked the
+# mainloop; stats() summarises them against FRAME_BUDGET_MS.
+
+DEBOUNCE_MS = 120
+POLL_MS = 10
+FRAME_BUDGET_MS = 16
+
+class SearchPipeline:
+    def __init__(self, widget, session, render, report=None, debounce_ms=DEBOUNCE_MS):
+        self.widget = widget
+        self.session = session
+        self.render = render
+        self.report = report
+        self.debounce_ms = debounce_ms
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = None
+        self.polling = None
+        self.waiting = None   # ticket of the newest submitted search
+        self.latencies = deque(maxlen=200)
+        self.working = deque(maxlen=200)
+        self.blocking = deque(maxlen=200)
+        threading.Thread(target=self.work, daemon=True).start()
+
+    # --------- Tk thread ---------
+    def request(self, term, delay=None):
+        ticket = self.session.begin()   # cancels any search already running
+        stamp = time.perf_counter()
+        if self.pending is not None:
+            self.widget.after_cancel(self.pending)
+        delay = self.debounce_ms if delay is None else delay
+        self.pending = self.widget.after(delay, lambda: self.submit(ticket, term, stamp))
+
+    def submit(self, ticket, term, stamp):
+        self.pending = None
+        if self.session.cancelled(ticket):
+            return
+        self.waiting = ticket
+        self.requests.put((ticket, term, (stamp, time.perf_counter())))
+        if self.polling is None:
+            self.polling = self.widget.after(POLL_MS, self.poll)
+
+    def poll(self):
+        self.polling = None
+        latest = None
+        while True:
+            try:
+                latest = self.results.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None:
+            ticket, results, (stamp, submitted) = latest
+            if not self.session.cancelled(ticket):
+                started = time.perf_counter()
+                self.render(results)
+                done = time.perf_counter()
+                self.latencies.append((done - stamp) * 1000)
+                self.working.append((done - submitted) * 1000)
+                self.blocking.append((done - started) * 1000)
+                if self.report:
+                    self.report(len(results), self.latencies[-1], self.blocking[-1])
+                return
+        # a cancelled search never answers; the newer one polls for itself
+        if not self.session.cancelled(self.waiting):
+            self.polling = self.widget.after(POLL_MS, self.poll)
+
+    def stats(self):
+        def summary(samples):
+            if not samples:
+                return {"count": 0}
+            ordered = sorted(samples)
+            return {
+                "count": len(ordered),
+                "p50_ms": round(ordered[len(ordered) // 2], 2),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+                "max_ms": round(ordered[-1], 2),
+                "over_budget": sum(1 for s in ordered if s > FRAME_BUDGET_MS)
+            }
+        return {
+            "keystroke_to_render": summary(self.latencies),
+            "debounced_to_render": summary(self.working),
+            "render_blocking": summary(self.blocking)
+        }
+
+    # --------- Worker thread ---------
+    def work(self):
+        while True:
+            ticket, term, stamp = self.requests.get()
+            while not self.requests.empty():
+                ticket, term, stamp = self.requests.get_nowait()  # only the newest request matters
+            results = self.session.search(term, ticket)
+            if results is not None:
+                self.results.put((ticket, results, stamp))
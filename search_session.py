@@ -0,0 +1,88 @@
+# Keeps the results of the searches typed so far. When a new term contains
+# the previous one ("ab" -> "abc") only the previous matches are filtered;
+# when the user backspaces to an earlier term its cached result is reused.
+# Every search takes a ticket from begin(); once a newer search has begun
+# the older one stops and returns None, so it can't overwrite newer results.
+#
+# Run from another thread, pass the lock the book is changed under: the
+# search takes it for one block of CHECK_EVERY rows at a time. If the book
+# changed between blocks it starts over once, holding the lock throughout.
+
+from contextlib import nullcontext
+
+CHECK_EVERY = 2048
+STALE = object()   # the book changed mid-search
+
+class SearchSession:
+    def __init__(self, contacts, lock=None):
+        self.contacts = contacts
+        self.lock = lock if lock is not None else nullcontext()
+        self.cache = []          # [(term, iids)], each term containing the one before it
+        self.version = contacts.version
+        self.generation = 0
+
+    def begin(self):
+        self.generation += 1
+        return self.generation
+
+    def cancelled(self, ticket):
+        return ticket != self.generation
+
+    def reset(self):
+        self.cache = []
+        self.version = self.contacts.version
+
+    def search(self, term, ticket=None):
+        if ticket is None:
+            ticket = self.begin()
+        term = term.lower()
+        rows = self.attempt(term, ticket)
+        if rows is STALE:
+            # changed again mid-search: this time keep the book still throughout
+            with self.lock:
+                rows = self.attempt(term, ticket)
+        return rows
+
+    def attempt(self, term, ticket):
+        with self.lock:
+            version = self.contacts.version
+            if self.version != version:
+                self.reset()
+            while self.cache and self.cache[-1][0] not in term:
+                self.cache.pop()
+            pool = None
+            if self.cache and self.cache[-1][0] == term:
+                iids = self.cache[-1][1]
+            elif not term:
+                iids = [iid for iid, _ in self.contacts.rows()]
+                self.cache.append((term, iids))
+            else:
+                pool = self.cache[-1][1] if self.cache else self.contacts.candidates(term)
+        if pool is not None:
+            iids = self.narrow(pool, term, ticket, version)
+            if iids is None or iids is STALE:
+                return iids
+            self.cache.append((term, iids))
+        rows = []
+        get = self.contacts.get
+        for start in range(0, len(iids), CHECK_EVERY):
+            with self.lock:
+                if self.contacts.version != version:
+                    return STALE
+                for iid in iids[start:start + CHECK_EVERY]:
+                    contact = get(iid)
+                    if contact is not None:
+                        rows.append((iid, contact))
+        return rows
+
+    def narrow(self, pool, term, ticket, version):
+        matches = self.contacts.matches
+        iids = []
+        for start in range(0, len(pool), CHECK_EVERY):
+            if self.cancelled(ticket):
+                return None
+            with self.lock:
+                if self.contacts.version != version:
+                    return STALE
+                iids.extend(iid for iid in pool[start:start + CHECK_EVERY] if matches(iid, term))
+        return iids
@@ -0,0 +1,221 @@
+import base64, json, sys, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+import data_dir
+from contact_store import ContactStore, ContactError, STATUSES
+from user_registry import UserRegistry
+
+# Headless JSON API over the same per-user books the GUIs use, for other
+# tools on this machine. Each user's book is loaded once into a shared
+# ContactStore; before every request the store picks up whatever the GUIs
+# (or other servers) wrote since, so nothing is re-read per request.
+# HTTP/1.1 keep-alive; HTTP Basic auth against users.json.
+#
+#   GET    /contacts?q=&status=&offset=0&limit=100
+#   GET    /contacts/<phone>
+#   POST   /contacts                    {"name", "phone", "email"?, "status"?}
+#   PUT    /contacts/<phone>            {"name", "phone", "email"?}
+#   PUT    /contacts/<phone>/status     {"status": "favourite"}
+#   DELETE /contacts/<phone>
+#
+# Contacts are addressed by phone, which is unique in a book and the same
+# key the journal uses; record ids only mean something inside one process.
+#
+#   python server.py [--host 127.0.0.1] [--port 8765] [--storage journal]
+
+HOST = "127.0.0.1"
+PORT = 8765
+STORAGE = "journal"
+PAGE = 100
+MAX_PAGE = 1000
+FIELDS = ("name", "phone", "email", "status")
+
+class Books:
+    # one loaded ContactStore per user, shared by all connections
+    def __init__(self, storage=STORAGE):
+        self.storage = storage
+        self.users = UserRegistry(data_dir.users_file())
+        self.stores = {}
+        self.lock = threading.Lock()
+
+    def open(self, user):
+        with self.lock:
+            entry = self.stores.get(user)
+            if entry is None:
+                store = ContactStore(storage=self.storage)
+                store.open(data_dir.user_book(user))
+                store.load()
+                entry = self.stores[user] = (store, threading.Lock())
+        return entry
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    server_version = "ContactBook/1.0"
+    books = None
+
+    # --------- Plumbing ---------
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def error(self, status, message):
+        self.send_json(status, {"error": message})
+
+    def content_length(self):
+        # None for a header that isn't a length: the body can't be skipped,
+        # so the connection is closed after this response
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            return None
+        return length
+
+    def body(self):
+        length = self.content_length()
+        if length is None:
+            raise ValueError("bad Content-Length")
+        if not length:
+            return {}
+        data = json.loads(self.rfile.read(length))
+        if not isinstance(data, dict):
+            raise ValueError("expected a JSON object")
+        bad = [f for f in FIELDS if f in data and not isinstance(data[f], str)]
+        if bad:
+            raise ValueError(f"{', '.join(bad)} must be a string")
+        return data
+
+    def user(self):
+        auth = self.headers.get("Authorization", "")
+        if auth.startswith("Basic "):
+            try:
+                user, _, password = base64.b64decode(auth[6:]).decode("utf-8").partition(":")
+            except ValueError:
+                return None
+            if self.books.users.check(user, password):
+                return user
+        return None
+
+    def handle_request(self, method):
+        user = self.user()
+        if user is None:
+            # drain the body so the connection can be reused
+            length = self.content_length()
+            if length:
+                self.rfile.read(length)
+            self.send_response(401)
+            self.send_header("WWW-Authenticate", 'Basic realm="contacts"')
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        url = urlsplit(self.path)
+        parts = [unquote(p) for p in url.path.strip("/").split("/")]
+        if not parts or parts[0] != "contacts" or len(parts) > 3 or (len(parts) == 3 and parts[2] != "status"):
+            return self.error(404, "Not found")
+        try:
+            body = self.body() if method in ("POST", "PUT") else {}
+        except ValueError as e:
+            return self.error(400, f"Bad request body: {e}")
+        store, lock = self.books.open(user)
+        with lock:
+            store.sync()   # pick up changes made by other processes
+            try:
+                self.route(store, method, parts[1:], parse_qs(url.query), body)
+            except ContactError as e:
+                self.error(400, str(e))
+
+    # --------- Endpoints ---------
+    def route(self, store, method, parts, query, body):
+        if not parts:
+            if method == "GET":
+                return self.list(store, query)
+            if method == "POST":
+                return self.add(store, body)
+            return self.error(405, "Method not allowed")
+        iid = store.index.find_phone(parts[0])
+        if iid is None:
+            return self.error(404, "Contact not found!")
+        if len(parts) == 2:
+            if method != "PUT":
+                return self.error(405, "Method not allowed")
+            store.set_status([iid], body.get("status"))
+        elif method == "PUT":
+            contact = store.get(iid)
+            store.edit(iid, body.get("name", contact.name), body.get("phone", contact.phone),
+                       body.get("email", contact.email))
+        elif method == "DELETE":
+            store.delete([iid])
+            return self.send_json(200, {"deleted": parts[0]})
+        elif method != "GET":
+            return self.error(405, "Method not allowed")
+        self.send_json(200, store.get(iid).to_dict())
+
+    def list(self, store, query):
+        def arg(name, default):
+            return query.get(name, [default])[0]
+        try:
+            offset = max(0, int(arg("offset", 0)))
+            limit = min(MAX_PAGE, max(1, int(arg("limit", PAGE))))
+        except ValueError:
+            return self.error(400, "offset and limit must be numbers")
+        term, status = arg("q", ""), arg("status", "")
+        if status and status not in STATUSES:
+            return self.error(400, f"Unknown status: {status}")
+        if term:
+            rows = store.search(term)
+            if status:
+                rows = [r for r in rows if r[1].status == status]
+        elif status:
+            rows = store.filter(status)
+        else:
+            rows = store.items()
+        self.send_json(200, {
+            "total": len(rows),
+            "offset": offset,
+            "limit": limit,
+            "contacts": [c.to_dict() for _, c in rows[offset:offset + limit]]
+        })
+
+    def add(self, store, body):
+        status = body.get("status") or "normal"
+        if status not in STATUSES:
+            raise ContactError(f"Unknown status: {status}")
+        iid = store.add(body.get("name", ""), body.get("phone", ""), body.get("email", ""), status)
+        self.send_json(201, store.get(iid).to_dict())
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def do_PUT(self):
+        self.handle_request("PUT")
+
+    def do_DELETE(self):
+        self.handle_request("DELETE")
+
+def serve(host=HOST, port=PORT, storage=STORAGE):
+    data_dir.migrate()
+    Handler.books = Books(storage)
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    print(f"Serving contacts on http://{host}:{port}/contacts")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = dict(zip(args[::2], args[1::2]))
+    serve(options.get("--host", HOST), int(options.get("--port", PORT)), options.get("--storage", STORAGE))
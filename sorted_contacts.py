@@ -0,0 +1,53 @@
+from bisect import bisect_left, bisect_right
+
+# Contact list kept in name order. Each record's casefolded name is cached
+# in a parallel list, so adding or editing one contact finds its place by
+# bisection instead of re-sorting (and re-lowercasing) the whole book.
+
+def sort_key(contact):
+    return contact["name"].casefold()
+
+class SortedContacts:
+    def __init__(self, contacts=()):
+        self.items = sorted(contacts, key=sort_key)
+        self.keys = [sort_key(c) for c in self.items]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def add(self, contact):
+        key = sort_key(contact)
+        index = bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.items.insert(index, contact)
+        return index
+
+    def pop(self, index):
+        del self.keys[index]
+        return self.items.pop(index)
+
+    def replace(self, index, contact):
+        key = sort_key(contact)
+        if self.keys[index] == key:
+            self.items[index] = contact
+            return index
+        self.pop(index)
+        return self.add(contact)
+
+    def index(self, contact):
+        key = sort_key(contact)
+        lo = bisect_left(self.keys, key)
+        hi = bisect_right(self.keys, key, lo)
+        for i in range(lo, hi):
+            if self.items[i] is contact:
+                return i
+        raise ValueError("contact not in list")
+
+    def to_list(self):
+        return list(self.items)
@@ -0,0 +1,143 @@
+import os, sqlite3, sys
+import journal
+
+# SQLite backend for a user's contact book (`{user}.db` next to `{user}.json`).
+# Takes the same {"op": ...} records as journal.py so final.py can switch
+# between the two with its STORAGE setting.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    email TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'normal'
+);
+CREATE INDEX IF NOT EXISTS contacts_phone ON contacts(phone);
+CREATE INDEX IF NOT EXISTS contacts_name ON contacts(lower(name));
+CREATE INDEX IF NOT EXISTS contacts_status ON contacts(status);
+"""
+
+COLUMNS = "name, phone, email, status"
+
+def db_path(contacts_file):
+    return os.path.splitext(contacts_file)[0] + ".db"
+
+def connect(path):
+    # callers serialise access themselves (Tk thread, or server.py's per-book lock)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def rows(cursor):
+    return [dict(r) for r in cursor]
+
+# --------- Queries ---------
+def load(conn):
+    return rows(conn.execute(f"SELECT {COLUMNS} FROM contacts ORDER BY id"))
+
+def count(conn):
+    return conn.execute("SELECT count(*) FROM contacts").fetchone()[0]
+
+def data_version(conn):
+    # changes when another connection (or process) commits to the file
+    return conn.execute("PRAGMA data_version").fetchone()[0]
+
+def phone_exists(conn, phone):
+    return conn.execute("SELECT 1 FROM contacts WHERE phone = ? LIMIT 1", (phone,)).fetchone() is not None
+
+def search(conn, term):
+    # same substring match as the in-memory index (name, phone or email);
+    # instr() runs in C, no per-row Python
+    term = term.lower()
+    return rows(conn.execute(
+        f"SELECT {COLUMNS} FROM contacts WHERE instr(lower(name), ?) > 0 OR instr(phone, ?) > 0 "
+        "OR instr(lower(email), ?) > 0 ORDER BY id",
+        (term, term, term)))
+
+def by_status(conn, status):
+    return rows(conn.execute(f"SELECT {COLUMNS} FROM contacts WHERE status = ? ORDER BY id", (status,)))
+
+def iter_load(path):
+    # same chunk stream as journal.iter_load, on a connection of its own so
+    # it can run on a loader thread
+    conn = connect(path)
+    try:
+        total = max(1, count(conn))
+        cursor = conn.execute(f"SELECT {COLUMNS} FROM contacts ORDER BY id")
+        done, size = 0, journal.FIRST_CHUNK
+        while True:
+            chunk = cursor.fetchmany(size)
+            if not chunk:
+                break
+            done += len(chunk)
+            yield "contacts", rows(chunk), done / total
+            size = journal.CHUNK
+        yield "ops", [], 1.0
+    finally:
+        conn.close()
+
+# --------- Mutations ---------
+def apply_op(conn, op):
+    kind = op.get("op")
+    if kind == "add":
+        c = journal.normalize(op["contact"])
+        conn.execute(f"INSERT INTO contacts ({COLUMNS}) VALUES (?, ?, ?, ?)",
+                     (c["name"], c["phone"], c["email"], c["status"]))
+    elif kind == "edit":
+        c = journal.normalize(op["contact"])
+        conn.execute("UPDATE contacts SET name = ?, phone = ?, email = ?, status = ? WHERE phone = ?",
+                     (c["name"], c["phone"], c["email"], c["status"], op["phone"]))
+    elif kind == "delete":
+        conn.execute("DELETE FROM contacts WHERE phone = ?", (op["phone"],))
+    elif kind == "status":
+        conn.execute("UPDATE contacts SET status = ? WHERE phone = ?", (op["status"], op["phone"]))
+
+def apply(conn, *ops):
+    with conn:
+        for op in ops:
+            apply_op(conn, op)
+
+def save(conn, contacts):
+    with conn:
+        conn.execute("DELETE FROM contacts")
+        conn.executemany(f"INSERT INTO contacts ({COLUMNS}) VALUES (?, ?, ?, ?)",
+                         [(c["name"], c["phone"], c["email"], c["status"]) for c in contacts])
+
+# --------- Migration ---------
+# PRAGMA user_version records that the JSON book was imported, so a book
+# whose contacts were all deleted later stays empty. Databases from before
+# the version was kept count as imported if they hold any contacts.
+MIGRATED = 1
+
+def migrate(json_path, path=None):
+    path = path or db_path(json_path)
+    conn = connect(path)
+    conn.execute("BEGIN IMMEDIATE")   # one process imports; the others wait and see the version
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] < MIGRATED:
+            if count(conn) == 0:
+                conn.executemany(f"INSERT INTO contacts ({COLUMNS}) VALUES (?, ?, ?, ?)",
+                                 [(c["name"], c["phone"], c["email"], c["status"]) for c in journal.load(json_path)])
+            conn.execute(f"PRAGMA user_version = {MIGRATED}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        conn.close()
+        raise
+    return conn
+
+if __name__ == "__main__":
+    # python sqlite_store.py [BOOK.json ...]   (default: every user's book)
+    import data_dir
+    from user_registry import UserRegistry
+    data_dir.migrate()
+    files = sys.argv[1:] or [data_dir.user_book(u) for u in UserRegistry(data_dir.users_file()).names()]
+    for json_path in files:
+        if not os.path.exists(json_path):
+            continue
+        conn = migrate(json_path)
+        print(f"{json_path} -> {db_path(json_path)} ({count(conn)} contacts)")
+        conn.close()
@@ -0,0 +1,52 @@
+import time
+import journal
+from background_loader import BackgroundLoader
+from contact_store import ContactStore
+
+class Widget:
+    def __init__(self):
+        self.jobs = []
+
+    def after(self, ms, fn):
+        self.jobs.append(fn)
+
+    def run(self, done, timeout=5.0):
+        end = time.perf_counter() + timeout
+        while self.jobs and not done() and time.perf_counter() < end:
+            self.jobs.pop(0)()
+            time.sleep(0.001)
+
+def test_the_book_arrives_a_screenful_first_then_in_chunks(tmp_path):
+    path = str(tmp_path / "u.json")
+    journal.save(path, [{"name": f"n{i}", "phone": str(i)} for i in range(5000)])
+    other = ContactStore(path).load()
+    other.delete([other.index.find_phone("7")])   # so the log has an op to replay too
+    store = ContactStore()
+    store.open(path)
+    sizes, progress, finished = [], [], []
+
+    def on_chunk(kind, payload, done):
+        added = store.load_chunk(kind, payload)
+        if kind == "contacts":
+            sizes.append(len(added))
+            progress.append(done)
+
+    widget = Widget()
+    BackgroundLoader(widget, store.iter_load(), on_chunk, lambda error=None: finished.append(error))
+    widget.run(lambda: finished)
+    assert finished == [None]
+    assert sizes[0] == journal.FIRST_CHUNK and len(sizes) > 2
+    assert progress == sorted(progress) and progress[-1] == 1.0
+    assert store.to_list() == ContactStore(path).load().to_list() and len(store) == 4999
+
+def test_a_book_that_fails_to_load_reports_the_error(tmp_path):
+    path = str(tmp_path / "u.json")
+    with open(path, "w") as f:
+        f.write('[{"name": "a", "phone": "1"}, {"na')
+    store = ContactStore()
+    store.open(path)
+    finished = []
+    widget = Widget()
+    BackgroundLoader(widget, store.iter_load(), lambda kind, payload, done: store.load_chunk(kind, payload), lambda error=None: finished.append(error))
+    widget.run(lambda: finished)
+    assert len(finished) == 1 and isinstance(finished[0], ValueError)
@@ -0,0 +1,59 @@
+import json, os, sys
+import book_sync
+from book_sync import Book, Pipe, Summary, delta, merge_into, sync
+from contact_store import ContactStore
+
+def books(tmp_path):
+    # shared contacts, one each side lacks, and one with different details
+    mine, theirs = ContactStore(str(tmp_path / "mine.json")), ContactStore(str(tmp_path / "theirs.json"))
+    for i in range(300):
+        for store in (mine, theirs):
+            store.add(f"n{i}", str(i), f"n{i}@x.org")
+    mine.add("only mine", "m1")
+    theirs.add("only theirs", "t1")
+    mine.edit(mine.index.find_phone("7"), "seven (mine)", "7", "")
+    theirs.toggle_status([theirs.index.find_phone("7")], "favourite")
+    return mine, theirs
+
+def contacts(store):
+    return sorted(tuple(c.to_dict().values()) for c in store)
+
+def test_sync_copies_what_each_side_lacks_and_keeps_ours_on_conflict(tmp_path):
+    mine, theirs = books(tmp_path)
+    stats = sync(mine, Book(theirs))
+    assert stats["sent"] == 2 and stats["received"] == 1
+    assert contacts(mine) == contacts(theirs)
+    seven = mine.get(mine.index.find_phone("7"))
+    assert (seven.name, seven.status) == ("seven (mine)", "normal")
+    assert mine.has_phone("t1") and theirs.has_phone("m1")
+    assert stats["hashes"] < 300   # only the differing branches were compared
+    for store, name in ((mine, "mine.json"), (theirs, "theirs.json")):
+        assert contacts(ContactStore(str(tmp_path / name)).load()) == contacts(store)
+    assert sync(mine, Book(theirs))["round_trips"] == 1
+
+def test_prefer_theirs_takes_their_version(tmp_path):
+    mine, theirs = books(tmp_path)
+    sync(mine, Book(theirs), prefer="theirs")
+    assert contacts(mine) == contacts(theirs)
+    seven = mine.get(mine.index.find_phone("7"))
+    assert (seven.name, seven.status) == ("n7", "favourite")
+
+def test_sync_over_a_pipe(tmp_path):
+    mine, theirs = books(tmp_path)
+    command = [sys.executable, os.path.abspath(book_sync.__file__), "--serve", str(tmp_path / "theirs.json")]
+    other = Pipe(command)
+    try:
+        sync(mine, other)
+    finally:
+        other.close()
+    assert contacts(ContactStore(str(tmp_path / "theirs.json")).load()) == contacts(mine)
+
+def test_delta_then_apply_gives_identical_summaries(tmp_path):
+    mine, theirs = books(tmp_path)
+    theirs.delete([theirs.index.find_phone("t1")])   # a delta only ever adds or overwrites
+    summary = json.loads(json.dumps({"records": Summary(theirs).all_records()}))
+    changes = json.loads(json.dumps(delta(mine, summary)))
+    assert sorted(c["phone"] for c in changes) == ["7", "m1"]
+    merge_into(theirs, changes)
+    assert Summary(theirs).nodes == Summary(mine).nodes
+    assert delta(mine, {"records": Summary(theirs).all_records()}) == []
@@ -0,0 +1,46 @@
+import io, json
+import pytest
+import cli
+from contact_store import ContactStore
+
+def test_lines_with_fields_that_are_not_text_get_their_own_error(tmp_path):
+    path = str(tmp_path / "u.json")
+    store = ContactStore(path)
+    lines = [
+        '{"op": "add", "name": 5, "phone": "123"}',
+        '{"op": "add", "contact": {"name": "A", "phone": ["1"]}}',
+        '{"op": "add", "name": "A", "phone": "1"}',
+        '{"op": "edit", "phone": "1", "contact": "B"}',
+        '{"op": "status", "phone": "1", "status": null}',
+        '{"op": "delete", "phone": 1}',
+        '{"op": "search", "q": 7}',
+    ]
+    out = io.StringIO()
+    assert cli.Runner(store, out, batch=10).run(lines) == 6
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["line"] for r in results if r["ok"]] == [3]
+    assert sorted(r["line"] for r in results) == list(range(1, 8))
+    assert ContactStore(path).load().to_list() == [{"name": "A", "phone": "1", "email": "", "status": "normal"}]
+
+@pytest.mark.parametrize("batch", ["0", "-5", "ten"])
+def test_a_batch_size_below_one_is_refused(tmp_path, batch):
+    with pytest.raises(SystemExit) as e:
+        cli.main(["--book", str(tmp_path / "u.json"), "--batch", batch])
+    assert e.value.code != 0 and "--batch" in str(e.value.code)
+
+def test_a_journal_log_pipes_straight_through(tmp_path):
+    source = ContactStore(str(tmp_path / "a.json"))
+    ids = [source.add(f"n{i}", str(i), f"n{i}@x.org") for i in range(5)]
+    source.toggle_status(ids[:3], "favourite")   # several rows: one batch line
+    source.edit(ids[1], "renamed", "11", "")
+    source.delete([ids[4]])
+    with open(tmp_path / "a.json.log") as f:
+        lines = f.readlines()
+    assert any('"op": "batch"' in line for line in lines)
+
+    path = str(tmp_path / "b.json")
+    out = io.StringIO()
+    assert cli.Runner(ContactStore(path), out).run(lines) == 0
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert len(results) == 5 + 3 + 1 + 1
+    assert ContactStore(path).load().to_list() == ContactStore(str(tmp_path / "a.json")).load().to_list()
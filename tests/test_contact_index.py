@@ -0,0 +1,34 @@
+import random
+from contact_index import ContactIndex
+from contact_store import ContactStore
+
+def contact(name, phone, email="", status="normal"):
+    return {"name": name, "phone": phone, "email": email, "status": status}
+
+def test_ids_stay_put_and_phones_follow_every_change():
+    index = ContactIndex([contact("A", "1"), contact("B", "2"), contact("C", "3")])
+    a, b, c = index.find_phone("1"), index.find_phone("2"), index.find_phone("3")
+    assert [a, b, c] == ["1", "2", "3"]
+    index.replace(b, contact("B2", "22"))
+    assert index.find_phone("22") == b and not index.has_phone("2")
+    index.remove(a)
+    assert index.get(a) is None and not index.has_phone("1")
+    d = index.add(contact("D", "1"))
+    assert d not in (a, b, c) and index.find_phone("1") == d
+    assert [iid for iid, _ in index.rows()] == [b, c, d]
+    index.clear()
+    assert len(index) == 0 and not index.has_phone("22")
+
+def test_store_operations_on_selected_ids_match_a_scan(tmp_path):
+    rnd = random.Random(3)
+    store = ContactStore(str(tmp_path / "u.json"))
+    for i in range(300):
+        store.add(f"n{i}", str(i))
+    picked = rnd.sample([iid for iid, _ in store.items()], 50)
+    phones = {store.get(iid).phone for iid in picked}
+    store.toggle_status(picked[:25], "favourite")
+    store.delete(picked[25:])
+    assert {c.phone for c in store if c.status == "favourite"} == {store.get(iid).phone for iid in picked[:25]}
+    assert all(not store.has_phone(p) for p in phones - {store.get(iid).phone for iid in picked[:25]})
+    assert len(store) == 275
+    assert ContactStore(str(tmp_path / "u.json")).load().to_list() == store.to_list()
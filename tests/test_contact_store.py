@@ -0,0 +1,109 @@
+import os
+import pytest
+from contact_store import ContactStore, ContactError
+
+def test_toggle_status_rejects_unknown_statuses(tmp_path):
+    store = ContactStore(str(tmp_path / "u.json"))
+    iid = store.add("A", "1")
+    with pytest.raises(ContactError):
+        store.toggle_status([iid], "vip")
+    assert store.get(iid).status == "normal"
+    store.toggle_status([iid], "favourite")
+    store.toggle_status([iid], "favourite")
+    assert ContactStore(str(tmp_path / "u.json")).load().get(iid).status == "normal"
+
+def test_fields_that_are_not_text_are_rejected_before_indexing(tmp_path):
+    path = str(tmp_path / "u.json")
+    store = ContactStore(path)
+    iid = store.add("A", "1")
+    for args in ((5, "123"), ("B", 123), ("B", "2", ["x"])):
+        with pytest.raises(ContactError):
+            store.add(*args)
+    with pytest.raises(ContactError):
+        store.edit(iid, "A", "1", 7)
+    with pytest.raises(ContactError):
+        with store.batch() as batch:
+            batch.add("C", "3", 3)
+    assert len(store) == 1 and not store.has_phone("123") and not store.has_phone("3")
+    assert ContactStore(path).load().to_list() == store.to_list()
+
+def test_an_edit_with_no_email_keeps_it_empty(tmp_path):
+    # askstring returns None when the "New email" prompt is cancelled
+    path = str(tmp_path / "u.json")
+    store = ContactStore(path)
+    iid = store.add("A", "1", "a@x.org")
+    store.edit(iid, "A2", "1", None)
+    assert store.get(iid).to_dict() == {"name": "A2", "phone": "1", "email": "", "status": "normal"}
+    assert ContactStore(path).load().to_list() == store.to_list()
+
+def test_a_failing_batch_changes_nothing(tmp_path):
+    path = str(tmp_path / "u.json")
+    store = ContactStore(path)
+    keep = store.add("A", "1")
+    with pytest.raises(ContactError):
+        with store.batch() as batch:
+            batch.add("B", "2")
+            batch.edit(keep, "A2", "11")
+            batch.add("C", "2")   # duplicate of the first add
+    with pytest.raises(ContactError):
+        with store.batch() as batch:
+            batch.add("D", "4", status="vip")
+    assert [c.to_dict() for c in store] == [{"name": "A", "phone": "1", "email": "", "status": "normal"}]
+    assert ContactStore(path).load().to_list() == store.to_list()
+
+def test_a_batch_that_raises_inside_the_block_is_rolled_back(tmp_path):
+    store = ContactStore(str(tmp_path / "u.json"))
+    with pytest.raises(RuntimeError):
+        with store.batch() as batch:
+            batch.add("A", "1")
+            raise RuntimeError
+    assert len(store) == 0
+    assert not os.path.exists(str(tmp_path / "u.json.log"))
+
+def test_a_batch_whose_write_fails_reloads_the_book(tmp_path, monkeypatch):
+    import journal
+    path = str(tmp_path / "u.json")
+    store = ContactStore(path)
+    store.add("A", "1")
+
+    def fail(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(journal, "append", fail)
+    with pytest.raises(OSError):
+        store.commit([("add", ("B", "2", "", "normal")), ("add", ("C", "3", "", "normal"))])
+    assert [c.phone for c in store] == ["1"]
+
+def test_a_close_whose_flush_fails_keeps_the_queue(tmp_path, monkeypatch):
+    import journal
+    path = str(tmp_path / "u.json")
+    store = ContactStore(write_behind=True)
+    store.open(path)
+    append = journal.append
+
+    def fail(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(journal, "append", fail)
+    store.add("A", "1")
+    with pytest.raises(OSError):
+        store.close()
+    assert store.writer is not None and len(store.writer.queued()) == 1
+    monkeypatch.setattr(journal, "append", append)
+    store.close()
+    assert store.writer is None
+    assert [c["phone"] for c in ContactStore(path).load().to_list()] == ["1"]
+
+def test_a_change_made_mid_load_does_not_duplicate_the_rest(tmp_path):
+    import journal
+    path = str(tmp_path / "u.json")
+    journal.save(path, [{"name": f"n{i}", "phone": str(i)} for i in range(5000)])
+    store = ContactStore(path)
+    chunks = store.iter_load()
+    store.load_chunk(*next(chunks)[:2])
+    iid = store.index.find_phone("0")
+    store.edit(iid, "renamed", "0")
+    for kind, payload, _ in chunks:
+        store.load_chunk(kind, payload)
+    phones = [c.phone for c in store]
+    assert len(phones) == len(set(phones)) == 5000
+    assert store.get(iid).name == "renamed"
+    assert ContactStore(path).load().to_list() == store.to_list()
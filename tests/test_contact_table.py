@@ -0,0 +1,28 @@
+import random
+from contact_index import ContactIndex
+from contact_table import ContactTable
+from contact_store import Contact
+
+def test_find_phone_matches_the_index_through_edits_and_deletes():
+    rnd = random.Random(0)
+    index, table = ContactIndex(), ContactTable()
+    iids = []
+    for step in range(2000):
+        phone = str(rnd.randint(0, 300))
+        live = [i for i in iids if index.get(i[0]) is not None]
+        kind = rnd.choice(["add", "edit", "delete"]) if live else "add"
+        if kind == "add" and not index.has_phone(phone):
+            iids.append((index.add(Contact("n", phone)), table.add(Contact("n", phone))))
+        elif kind == "edit" and not index.has_phone(phone):
+            a, b = rnd.choice(live)
+            index.replace(a, Contact("n", phone))
+            table.replace(b, Contact("n", phone))
+        elif kind == "delete":
+            a, b = rnd.choice(live)
+            index.remove(a)
+            table.remove(b)
+    ids = dict(iids)
+    for phone in map(str, range(301)):
+        found = index.find_phone(phone)
+        assert table.find_phone(phone) == (ids[found] if found is not None else None)
+        assert table.has_phone(phone) == index.has_phone(phone)
@@ -0,0 +1,38 @@
+import json, os
+import data_dir
+from user_registry import UserRegistry
+
+def test_migrate_moves_known_users_and_skips_unsafe_names(tmp_path):
+    legacy, root = tmp_path / "old", str(tmp_path / "data")
+    legacy.mkdir()
+    registry = UserRegistry(str(legacy / "users.json"), iterations=1)
+    for name in ("ann", "../outside", "users", "."):
+        registry.add(name, "pw")
+    for name in ("ann", "../outside"):
+        with open(legacy / (name + ".json"), "w") as f:
+            json.dump([{"name": name, "phone": "1"}], f)
+
+    users_json = data_dir.users_file(root)
+    assert data_dir.user_book("ann", root).startswith(os.path.join(root, "books"))
+    assert (legacy / "ann.json").exists() and (legacy / "users.json.log").exists()
+
+    moved, skipped = data_dir.migrate(str(legacy), root)
+    assert moved == [("ann", data_dir.book_path("ann", root))]
+    assert sorted(skipped) == sorted(["../outside", "users", "."])
+    assert os.path.exists(data_dir.book_path("ann", root))
+    assert (tmp_path / "outside.json").exists()
+    assert sorted(UserRegistry(users_json).names()) == sorted(["ann", "../outside", "users", "."])
+    assert data_dir.migrate(str(legacy), root)[0] == []
+
+def test_migrate_leaves_plaintext_passwords_to_the_next_login(tmp_path):
+    legacy, root = tmp_path / "old", str(tmp_path / "data")
+    legacy.mkdir()
+    with open(legacy / "users.json", "w") as f:
+        json.dump({"ann": "secret", "bo": "pw"}, f)
+    data_dir.migrate(str(legacy), root)
+    with open(data_dir.users_file(root)) as f:
+        assert json.load(f) == {"ann": "secret", "bo": "pw"}
+    assert UserRegistry(data_dir.users_file(root), iterations=1).check("ann", "secret")
+    with open(data_dir.users_file(root)) as f:
+        stored = json.load(f)
+    assert stored["bo"] == "pw" and stored["ann"].startswith("pbkdf2_sha256$")
@@ -0,0 +1,40 @@
+import pytest
+import exporter, importer
+from contact_store import ContactStore
+
+BOOK = [("Ann Lee", "555-0101", "ann@example.com"), ("Bo, Jr.", "555-0102", ""),
+        ("Cé \"Quote\"", "555-0103", "ce@example.com"), ("Dee;Semi", "555-0104", "d@x.org")]
+
+def book(path):
+    store = ContactStore(str(path))
+    with store.batch() as batch:
+        for name, phone, email in BOOK:
+            batch.add(name, phone, email)
+    return store
+
+@pytest.mark.parametrize("ext", [".csv", ".vcf"])
+def test_export_then_import_gives_the_same_contacts(tmp_path, ext):
+    out = str(tmp_path / ("out" + ext))
+    exporter.export(book(tmp_path / "a.json"), out)
+    other = ContactStore(str(tmp_path / "b.json"))
+    counts = importer.import_file(other, out, workers=1)
+    assert counts == {"added": 4, "duplicates": 0, "invalid": 0}
+    assert [(c.name, c.phone, c.email) for c in other] == BOOK
+    assert importer.import_file(other, out, workers=1)["duplicates"] == 4
+
+def test_the_process_pool_reads_the_same_records(tmp_path, monkeypatch):
+    out = str(tmp_path / "out.csv")
+    exporter.export(book(tmp_path / "a.json"), out)
+    monkeypatch.setattr(importer, "PARALLEL_BYTES", 1)
+    monkeypatch.setattr(importer, "CHUNK", 1)
+    records = [r for _, chunk, _ in importer.iter_chunks(out, workers=2) for r in chunk]
+    assert records == BOOK
+
+def test_a_failed_export_leaves_no_temp_file(tmp_path):
+    def broken():
+        yield {"name": "A", "phone": "1", "email": "", "status": "normal"}
+        raise OSError("disk full")
+    out = tmp_path / "out.csv"
+    with pytest.raises(OSError):
+        exporter.export(broken(), str(out))
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,98 @@
+import json, os, random
+import pytest
+import journal
+
+def contact(name, phone, status="normal"):
+    return {"name": name, "phone": phone, "email": "", "status": status}
+
+def test_replay_applies_the_log_over_the_snapshot(tmp_path):
+    path = str(tmp_path / "u.json")
+    journal.save(path, [contact("A", "1"), contact("B", "2")])
+    journal.append(path,
+                   {"op": "add", "contact": contact("C", "3")},
+                   {"op": "edit", "phone": "1", "contact": contact("A2", "11")},
+                   {"op": "delete", "phone": "2"},
+                   {"op": "status", "phone": "3", "status": "favourite"})
+    assert journal.load(path) == [contact("A2", "11"), contact("C", "3", "favourite")]
+
+def test_replaying_twice_gives_the_same_book(tmp_path):
+    path = str(tmp_path / "u.json")
+    ops = [{"op": "add", "contact": contact("A", "1")}, {"op": "edit", "phone": "1", "contact": contact("B", "2")}]
+    journal.append(path, *ops)
+    journal.append(path, *ops)
+    assert journal.load(path) == [contact("B", "2")]
+
+def test_torn_last_line_is_ignored(tmp_path):
+    path = str(tmp_path / "u.json")
+    journal.append(path, {"op": "add", "contact": contact("A", "1")})
+    with open(path + journal.LOG_SUFFIX, "a") as f:
+        f.write('{"op": "add", "contact": {"na')
+    assert journal.load(path) == [contact("A", "1")]
+
+def test_compaction_folds_the_log_into_the_snapshot(tmp_path):
+    path = str(tmp_path / "u.json")
+    journal.save(path, [contact("A", "1")])
+    journal.append(path, {"op": "add", "contact": contact("B", "2")}, {"op": "delete", "phone": "1"})
+    os.replace(path + journal.LOG_SUFFIX, path + journal.COMPACTING_SUFFIX)
+    journal.append(path, {"op": "add", "contact": contact("C", "3")})
+    journal.compact(path)
+    assert not os.path.exists(path + journal.COMPACTING_SUFFIX)
+    with open(path) as f:
+        assert json.load(f) == [contact("B", "2")]
+    assert journal.load(path) == [contact("B", "2"), contact("C", "3")]
+
+def test_read_since_follows_a_compaction(tmp_path):
+    path = str(tmp_path / "u.json")
+    journal.append(path, {"op": "add", "contact": contact("A", "1")})
+    _, position = journal.load_at(path)
+    journal.append(path, {"op": "add", "contact": contact("B", "2")})
+    os.replace(path + journal.LOG_SUFFIX, path + journal.COMPACTING_SUFFIX)
+    journal.append(path, {"op": "add", "contact": contact("C", "3")})
+    ops, position = journal.read_since(path, position)
+    assert [op["contact"]["phone"] for op in ops] == ["2", "3"]
+    journal.compact(path)
+    ops, position = journal.read_since(path, position)
+    assert ops == []
+
+def test_corrupt_snapshot_raises_instead_of_loading_empty(tmp_path):
+    path = str(tmp_path / "u.json")
+    with open(path, "w") as f:
+        f.write('[{"name": "A", "phone": "1"}, {"na')
+    journal.append(path, {"op": "add", "contact": contact("B", "2")})
+    with pytest.raises(json.JSONDecodeError):
+        journal.load(path)
+    with pytest.raises(json.JSONDecodeError):
+        list(journal.iter_load(path))
+    os.replace(path + journal.LOG_SUFFIX, path + journal.COMPACTING_SUFFIX)
+    with pytest.raises(json.JSONDecodeError):
+        journal.compact(path)
+    with open(path) as f:
+        assert f.read().startswith('[{"name": "A"')
+
+def test_a_torn_batch_is_dropped_whole(tmp_path):
+    path = str(tmp_path / "u.json")
+    journal.append(path, {"op": "add", "contact": contact("A", "1")})
+    journal.append(path, {"op": "add", "contact": contact("B", "2")}, {"op": "add", "contact": contact("C", "3")})
+    log = path + journal.LOG_SUFFIX
+    with open(log, "rb+") as f:
+        f.truncate(os.path.getsize(log) - 20)   # crashed partway through the batch
+    assert journal.load(path) == [contact("A", "1")]
+    journal.append(path, {"op": "add", "contact": contact("D", "4")})
+    assert journal.load(path) == [contact("A", "1"), contact("D", "4")]
+
+def test_iter_contacts_streams_what_load_returns(tmp_path):
+    rnd = random.Random(0)
+    for n in range(200):
+        path = str(tmp_path / f"u{n}.json")
+        phones = [str(p) for p in range(8)]
+        journal.save(path, [contact(f"s{p}", p) for p in rnd.sample(phones, rnd.randint(0, 5))])
+        for _ in range(rnd.randint(0, 12)):
+            phone = rnd.choice(phones)
+            journal.append(path, rnd.choice([
+                {"op": "add", "contact": contact(f"a{phone}", phone)},
+                {"op": "edit", "phone": phone, "contact": contact("e", rnd.choice(phones))},
+                {"op": "delete", "phone": phone},
+                {"op": "status", "phone": phone, "status": "blocked"}]))
+            if rnd.random() < 0.1 and not os.path.exists(path + journal.COMPACTING_SUFFIX):
+                os.replace(path + journal.LOG_SUFFIX, path + journal.COMPACTING_SUFFIX)
+        assert list(journal.iter_contacts(path)) == journal.load(path)
@@ -0,0 +1,74 @@
+import time
+from contact_store import ContactStore
+from search_pipeline import SearchPipeline
+from search_session import SearchSession
+
+class Widget:
+    # after()/after_cancel() with a loop the test turns by hand
+    def __init__(self):
+        self.jobs = {}
+        self.next = 0
+
+    def after(self, ms, fn):
+        self.next += 1
+        self.jobs[self.next] = (time.perf_counter() + ms / 1000, fn)
+        return self.next
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def step(self):
+        job, (due, fn) = min(self.jobs.items(), key=lambda j: j[1][0])
+        time.sleep(max(0.0, due - time.perf_counter()))
+        del self.jobs[job]
+        fn()
+
+    def run(self, timeout=2.0):
+        # until nothing is scheduled
+        end = time.perf_counter() + timeout
+        while self.jobs and time.perf_counter() < end:
+            self.step()
+
+def pipeline(rendered, terms=None):
+    store = ContactStore()
+    for i in range(200):
+        store.add(["Anna", "Bob", "Priya"][i % 3] + f" {i}", str(1000 + i))
+    session = SearchSession(store.index, store.mem_lock)
+    if terms is not None:
+        search = session.search
+        session.search = lambda term, ticket=None: terms.append(term) or search(term, ticket)
+    widget = Widget()
+    return widget, SearchPipeline(widget, session, rendered.append, debounce_ms=20), store
+
+def test_only_the_last_keystroke_is_searched_and_rendered():
+    rendered, terms = [], []
+    widget, pipe, store = pipeline(rendered, terms)
+    for i in range(1, 6):
+        pipe.request("priya"[:i])
+    widget.run()
+    assert terms == ["priya"]
+    assert len(rendered) == 1
+    assert [iid for iid, _ in rendered[0]] == [iid for iid, _ in store.index.search("priya")]
+    assert widget.jobs == {}   # polling stopped once the answer rendered
+
+def test_a_search_overtaken_while_running_never_renders():
+    rendered = []
+    widget, pipe, store = pipeline(rendered)
+    pipe.request("anna", delay=0)
+    widget.run()
+    pipe.request("bob", delay=0)
+    widget.step()          # submitted to the worker
+    pipe.session.begin()   # a newer keystroke lands before the answer is drawn
+    time.sleep(0.05)
+    widget.run()
+    assert len(rendered) == 1 and all(c.name.startswith("Anna") for _, c in rendered[0])
+    assert widget.jobs == {}
+
+def test_latency_is_recorded_per_render():
+    rendered = []
+    widget, pipe, _ = pipeline(rendered)
+    pipe.request("bob", delay=0)
+    widget.run()
+    stats = pipe.stats()
+    assert stats["keystroke_to_render"]["count"] == 1
+    assert stats["render_blocking"]["count"] == 1
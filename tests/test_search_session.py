@@ -0,0 +1,71 @@
+import threading
+import search_session
+from contact_store import ContactStore
+from search_session import SearchSession
+
+def book(n=500):
+    store = ContactStore()
+    for i in range(n):
+        store.add(["Anna", "Annabel", "Bob", "Priya"][i % 4] + f" {i}", str(1000 + i))
+    return store
+
+def counting(index):
+    calls = []
+    matches = index.matches
+    index.matches = lambda iid, term: calls.append(iid) or matches(iid, term)
+    return calls
+
+def scan(store, term):
+    return [iid for iid, _ in store.index.search(term)]
+
+def test_a_longer_term_only_checks_the_previous_matches():
+    store = book()
+    session = SearchSession(store.index)
+    calls = counting(store.index)
+    first = session.search("ann")
+    calls.clear()
+    second = session.search("anna")
+    assert [iid for iid, _ in second] == scan(store, "anna")
+    assert len(calls) <= len(first)
+
+def test_backspacing_reuses_the_cached_result():
+    store = book()
+    session = SearchSession(store.index)
+    calls = counting(store.index)
+    ann = session.search("ann")
+    session.search("annab")
+    calls.clear()
+    assert session.search("ann") == ann
+    assert calls == []
+
+def test_a_search_started_before_a_newer_one_returns_none():
+    store = book()
+    session = SearchSession(store.index)
+    old = session.begin()
+    session.begin()
+    assert session.search("ann", old) is None
+    assert session.search("ann") is not None
+
+def test_a_book_changed_mid_search_restarts_once_under_the_lock(monkeypatch):
+    monkeypatch.setattr(search_session, "CHECK_EVERY", 16)
+    store = book()
+    entered = []
+
+    class Lock:
+        # changes the book the third time a search block takes it
+        def __init__(self):
+            self.lock = threading.RLock()
+
+        def __enter__(self):
+            self.lock.acquire()
+            entered.append(1)
+            if len(entered) == 3:
+                store.add("Annabel late", "999")
+
+        def __exit__(self, *exc):
+            self.lock.release()
+
+    session = SearchSession(store.index, Lock())
+    rows = session.search("annab")
+    assert [iid for iid, _ in rows] == scan(store, "annab")
+    assert any(c.phone == "999" for _, c in rows)
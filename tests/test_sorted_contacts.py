@@ -0,0 +1,27 @@
+import random
+from contact_store import ContactStore
+from sorted_contacts import SortedContacts, sort_key
+
+def test_adds_edits_and_removals_keep_name_order():
+    rnd = random.Random(9)
+    names = ["anna", "Anna", "bob", "Émile", "zoe", "Zoë", "priya", "Priya K"]
+    book = SortedContacts({"name": rnd.choice(names), "phone": str(i)} for i in range(50))
+    for i in range(300):
+        r = rnd.random()
+        if r < 0.4:
+            book.add({"name": rnd.choice(names), "phone": f"a{i}"})
+        elif r < 0.8:
+            c = book[rnd.randrange(len(book))]
+            book.replace(book.index(c), {"name": rnd.choice(names), "phone": c["phone"]})
+        elif len(book):
+            book.pop(book.index(book[rnd.randrange(len(book))]))
+        assert book.keys == [sort_key(c) for c in book]
+        assert book.keys == sorted(book.keys)
+
+def test_a_sorted_store_lists_contacts_by_name(tmp_path):
+    store = ContactStore(str(tmp_path / "u.json"), sort_by_name=True)
+    for name, phone in [("mira", "1"), ("Anil", "2"), ("zed", "3"), ("bea", "4")]:
+        store.add(name, phone)
+    store.edit(store.index.find_phone("3"), "Aaron", "3")
+    assert [c.name for c in store] == ["Aaron", "Anil", "bea", "mira"]
+    assert [c.name for _, c in store.items()] == ["Aaron", "Anil", "bea", "mira"]
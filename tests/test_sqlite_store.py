@@ -0,0 +1,46 @@
+import journal, sqlite_store
+from contact_store import ContactStore
+
+def contact(name, phone, email=""):
+    return {"name": name, "phone": phone, "email": email, "status": "normal"}
+
+def test_migration_imports_the_json_book_once(tmp_path):
+    path = str(tmp_path / "u.json")
+    journal.save(path, [contact("A", "1"), contact("B", "2")])
+    store = ContactStore(path, storage="sqlite")
+    store.open(path)
+    store.load()
+    assert sorted(c.name for c in store) == ["A", "B"]
+    store.delete([iid for iid, _ in store.items()])
+    store.db.close()
+
+    store = ContactStore(path, storage="sqlite")
+    store.open(path)
+    store.load()
+    assert len(store) == 0
+    store.db.close()
+
+def test_databases_from_before_the_version_count_as_migrated(tmp_path):
+    path = str(tmp_path / "u.json")
+    journal.save(path, [contact("A", "1")])
+    conn = sqlite_store.connect(sqlite_store.db_path(path))
+    sqlite_store.save(conn, [contact("C", "3")])
+    conn.close()
+    conn = sqlite_store.migrate(path)
+    assert [c["name"] for c in sqlite_store.load(conn)] == ["C"]
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == sqlite_store.MIGRATED
+    conn.close()
+
+def test_search_matches_the_same_fields_as_memory(tmp_path):
+    path = str(tmp_path / "u.json")
+    book = [contact("Ann", "555", "ann@x.org"), contact("Bob", "777", "bob@mail.com"), contact("Cy", "123")]
+    journal.save(path, book)
+    memory = ContactStore(path)
+    memory.open(path)
+    memory.load()
+    sqlite = ContactStore(path, storage="sqlite")
+    sqlite.open(path)
+    sqlite.load()
+    for term in ("ann", "MAIL", "55", "@", "o", "zz"):
+        assert [c.name for _, c in sqlite.search(term)] == [c.name for _, c in memory.search(term)], term
+    sqlite.db.close()
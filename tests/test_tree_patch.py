@@ -0,0 +1,30 @@
+import random
+import tree_patch
+from bench import HeadlessTree
+
+def test_patch_reaches_the_new_order():
+    rnd = random.Random(0)
+    for _ in range(500):
+        tree, shown = HeadlessTree(), {}
+        for _ in range(4):
+            ids = [f"r{i}" for i in range(rnd.randint(0, 30))]
+            rows = [(iid, (iid, rnd.randint(0, 2))) for iid in rnd.sample(ids, rnd.randint(0, len(ids)))]
+            shown = tree_patch.patch(tree, shown, rows)
+            assert tree.order == [iid for iid, _ in rows]
+            assert all(tree.values[iid] == values for iid, values in rows)
+
+def test_fill_never_asks_for_an_index():
+    tree = HeadlessTree()
+    tree.index = None
+    tree_patch.patch(tree, {}, [(str(i), (i,)) for i in range(100)])
+    assert tree.calls == 100
+
+def test_the_headless_tree_walks_siblings_like_tk():
+    tree = HeadlessTree()
+    for i in range(10):
+        tree.insert("", "end", iid=str(i))
+    assert tree.walked == 0
+    assert tree.index("7") == 7 and tree.walked == 7
+    tree.insert("", 3, iid="x")
+    tree.move("9", "", 1)
+    assert tree.order[:5] == ["0", "9", "1", "2", "x"] and tree.walked == 7 + 3 + 1
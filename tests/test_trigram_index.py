@@ -0,0 +1,25 @@
+import random
+from contact_index import ContactIndex
+
+def scan(index, term):
+    term = term.lower()
+    return [iid for iid, c in index.rows()
+            if term in c["name"].lower() or term in c["phone"] or term in c["email"].lower()]
+
+def test_search_matches_a_scan_through_adds_edits_and_deletes():
+    rnd = random.Random(4)
+    words = ["anna", "annabel", "bob", "priya", "sushant", "shreya", "x"]
+
+    def contact():
+        return {"name": f"{rnd.choice(words)} {rnd.choice(words)}".title(), "phone": str(rnd.randrange(10 ** 6)),
+                "email": rnd.choice(["", "a@gmail.com", "Priya@Example.org"]), "status": "normal"}
+
+    index = ContactIndex(contact() for _ in range(200))
+    terms = ["a", "an", "ann", "annab", "YA S", "gmail", "@EX", "12", "123", "zzz", ""]
+    for _ in range(50):
+        iids = [iid for iid, _ in index.rows()]
+        index.replace(rnd.choice(iids), contact())
+        index.remove(rnd.choice(iids))
+        index.add(contact())
+        for term in terms:
+            assert [iid for iid, _ in index.search(term)] == scan(index, term)
@@ -0,0 +1,46 @@
+import json, os
+import journal, user_registry
+from user_registry import UserRegistry
+
+def test_the_log_is_folded_into_users_json(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "COMPACT_BYTES", 1000)
+    path = str(tmp_path / "users.json")
+    early = UserRegistry(path, iterations=1)
+    assert early.names() == []
+    users = UserRegistry(path, iterations=1)
+    for i in range(20):
+        assert users.add(f"u{i}", f"p{i}")
+    assert os.path.getsize(path + user_registry.LOG_SUFFIX) < 1000
+    with open(path) as f:
+        assert len(json.load(f)) >= 10
+    for registry in (users, early, UserRegistry(path, iterations=1)):
+        assert sorted(registry.names()) == sorted(f"u{i}" for i in range(20))
+        assert registry.check("u7", "p7") and not registry.check("u7", "p8")
+
+def plaintext_users(path):
+    with open(path) as f:
+        return {name for name, stored in json.load(f).items() if user_registry.parse_hash(stored) is None}
+
+def test_plaintext_passwords_are_hashed_and_leave_the_file(tmp_path):
+    path = str(tmp_path / "users.json")
+    with open(path, "w") as f:
+        json.dump({"ann": "secret", "bo": "pbkdf2_sha256$not$a$hash", "cy": "pbkdf2_sha256$x"}, f)
+    users = UserRegistry(path, iterations=1)
+    assert users.check("bo", "pbkdf2_sha256$not$a$hash")
+    assert not users.check("cy", "pbkdf2_sha256$y")
+    assert plaintext_users(path) == {"ann", "cy"}
+    assert users.hash_plaintext() == 2
+    assert plaintext_users(path) == set()
+    assert not os.path.exists(path + user_registry.LOG_SUFFIX)
+    fresh = UserRegistry(path, iterations=1)
+    assert fresh.check("ann", "secret") and fresh.check("cy", "pbkdf2_sha256$x")
+    assert not fresh.check("ann", "Secret")
+
+def test_older_hashes_are_upgraded_at_login(tmp_path):
+    path = str(tmp_path / "users.json")
+    UserRegistry(path, iterations=1).add("ann", "secret")
+    users = UserRegistry(path, iterations=2)
+    assert users.check("ann", "secret")
+    fresh = UserRegistry(path, iterations=2)
+    assert fresh.check("ann", "secret")
+    assert fresh.users["ann"].startswith("pbkdf2_sha256$2$")
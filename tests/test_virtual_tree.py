@@ -0,0 +1,36 @@
+import random
+import pytest
+from bench import HeadlessTree, HeadlessScrollbar, row_values
+from contact_store import ContactStore
+from virtual_tree import VirtualTree
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_patch_rows_matches_a_full_redraw(columnar):
+    rnd = random.Random(1)
+    store = ContactStore(columnar=columnar)
+    for i in range(200):
+        store.add(f"n{i}", str(i))
+    tree = VirtualTree(None, HeadlessScrollbar(), row_values, tree=HeadlessTree())
+    tree.set_rows(store.filter("normal"))
+    tree.top = 50
+    next_phone = 200
+    for _ in range(50):
+        gone, rows = set(), {}
+        for iid, c in rnd.sample(list(store.items()), 5):
+            if rnd.random() < 0.3:
+                store.delete([iid])
+                gone.add(iid)
+            else:
+                store.toggle_status([iid], "favourite")
+                if store.get(iid).status == "normal":
+                    rows[iid] = store.get(iid)
+                else:
+                    gone.add(iid)
+        iid = store.add("new", str(next_phone))
+        next_phone += 1
+        rows[iid] = store.get(iid)
+        tree.patch_rows(gone, rows)
+        expected = [(iid, row_values(c)) for iid, c in store.filter("normal")]
+        assert [(iid, row_values(c)) for iid, c in tree.rows] == expected
+        window = tree.rows[tree.start:tree.start + len(tree.slots)]
+        assert tree.slot_values == [row_values(c) for _, c in window]
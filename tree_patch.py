@@ -0,0 +1,61 @@
+from bisect import bisect_left
+
+# Bring a ttk.Treeview from the rows it currently shows to a new list of
+# rows using the fewest Tk calls: delete what is gone, update values that
+# changed, and only move the rows that fall outside the longest run that
+# is already in the right order. Rows are keyed by their iid, so scroll
+# position and selection survive a refresh.
+
+def stable_rows(order, new_order):
+    # iids of the longest increasing run of old positions in the new order
+    position = {iid: i for i, iid in enumerate(order)}
+    tails, tail_ids, prev = [], [], {}
+    for iid in new_order:
+        pos = position.get(iid)
+        if pos is None:
+            continue
+        k = bisect_left(tails, pos)
+        prev[iid] = tail_ids[k - 1] if k else None
+        if k == len(tails):
+            tails.append(pos)
+            tail_ids.append(iid)
+        else:
+            tails[k] = pos
+            tail_ids[k] = iid
+    keep = set()
+    iid = tail_ids[-1] if tail_ids else None
+    while iid is not None:
+        keep.add(iid)
+        iid = prev[iid]
+    return keep
+
+def patch(tree, shown, rows):
+    # shown: iid -> values currently in the tree, in display order
+    # rows: (iid, values) pairs to display; returns the new `shown`
+    new = dict(rows)
+    gone = [iid for iid in shown if iid not in new]
+    if gone:
+        tree.delete(*gone)
+    order = [iid for iid in shown if iid in new]
+    keep = stable_rows(order, new)
+
+    # Rows that have to move come out first, which leaves just the kept
+    # rows in the tree, already in the new order. The i-th row of the new
+    # order then always goes at index i, so nothing asks Tk for an index
+    # (a walk over the siblings each time), and once the last kept row is
+    # passed the rest go on with "end", which Tk appends without a walk.
+    moved = [iid for iid in order if iid not in keep]
+    if moved:
+        tree.detach(*moved)
+    left = len(keep)
+    for i, (iid, values) in enumerate(new.items()):
+        if iid not in shown:
+            tree.insert("", i if left else "end", iid=iid, values=values)
+            continue
+        if iid in keep:
+            left -= 1
+        else:
+            tree.move(iid, "", i if left else "end")
+        if shown[iid] != values:
+            tree.item(iid, values=values)
+    return new
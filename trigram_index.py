@@ -0,0 +1,59 @@
+from collections import defaultdict
+
+# Inverted trigram index over name, phone and email. A substring query of
+# three or more characters only has to look at records that contain every
+# trigram of the query; those candidates are then checked with a real `in`
+# test, since sharing trigrams doesn't guarantee a contiguous match.
+
+SEP = "\x00"
+
+def searchable_text(contact):
+    return SEP.join((contact["name"].lower(), contact["phone"], (contact.get("email") or "").lower()))
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2) if SEP not in text[i:i + 3]}
+
+class TrigramIndex:
+    def __init__(self):
+        self.postings = defaultdict(set)
+        self.texts = {}
+
+    def add(self, key, contact):
+        text = searchable_text(contact)
+        self.texts[key] = text
+        for gram in trigrams(text):
+            self.postings[gram].add(key)
+
+    def remove(self, key):
+        text = self.texts.pop(key, None)
+        if text is None:
+            return
+        for gram in trigrams(text):
+            keys = self.postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[gram]
+
+    def update(self, key, contact):
+        if self.texts.get(key) != searchable_text(contact):
+            self.remove(key)
+            self.add(key, contact)
+
+    def clear(self):
+        self.postings.clear()
+        self.texts.clear()
+
+    def candidates(self, term):
+        grams = trigrams(term)
+        if not grams:
+            return None  # too short to narrow down, caller checks every record
+        lists = sorted((self.postings.get(g, ()) for g in grams), key=len)
+        if not lists[0]:
+            return set()
+        found = set(lists[0])
+        for keys in lists[1:]:
+            found &= keys
+            if not found:
+                break
+        return found
@@ -0,0 +1,238 @@
+import base64, binascii, hashlib, hmac, json, os, secrets, threading, time
+import journal
+
+# The accounts in users.json, loaded once and kept in memory. users.json
+# stays the snapshot ({"name": "password", ...}); each signup is appended
+# as one JSON line to users.json.log instead of rewriting the file. Before
+# answering, the registry stats both files and re-reads only what changed:
+# new lines at the end of the log, or everything if users.json itself
+# was replaced. Several app windows (or kiosk sessions) can share the
+# files: if two of them sign up the same name at once, the line that
+# landed first in the log wins for both. Like a book's journal, the log
+# is folded into users.json once it passes journal.COMPACT_BYTES; writers
+# hold the same kind of file lock (users.json.lock) meanwhile.
+#
+# Passwords are stored as salted PBKDF2-SHA256 hashes with the cost in
+# the record ("pbkdf2_sha256$rounds$salt$hash"), so ITERATIONS can be
+# raised later: older hashes are upgraded the next time their owner logs
+# in. Plaintext passwords from before hashing are hashed at their owner's
+# next login, and users.json is rewritten so none stays on disk;
+# hash_plaintext() (`python data_dir.py`) does them all at once. A check costs a few
+# hundred milliseconds on purpose, so the GUIs run it off the Tk thread
+# (background_loader.run_in_background), and a successful check is
+# remembered for CACHE_SECONDS so unlocking the same session again is
+# instant.
+
+USER_FILE = "users.json"
+LOG_SUFFIX = ".log"
+SCHEME = "pbkdf2_sha256"
+ITERATIONS = 600000
+CACHE_SECONDS = 300
+
+# --------- Hashing ---------
+def b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+def hash_password(password, iterations=ITERATIONS):
+    salt = secrets.token_bytes(16)
+    key = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"{SCHEME}${iterations}${b64(salt)}${b64(key)}"
+
+def parse_hash(stored):
+    # (iterations, salt, key) if stored is a hash in our format, else None
+    # (a plaintext password may well start with "pbkdf2_sha256$")
+    parts = stored.split("$")
+    if len(parts) != 4 or parts[0] != SCHEME or not parts[1].isdigit():
+        return None
+    try:
+        return int(parts[1]), base64.b64decode(parts[2], validate=True), base64.b64decode(parts[3], validate=True)
+    except binascii.Error:
+        return None
+
+def verify_password(stored, password):
+    parsed = parse_hash(stored)
+    if parsed is None:
+        # plaintext from before passwords were hashed
+        return hmac.compare_digest(stored.encode("utf-8"), password.encode("utf-8"))
+    iterations, salt, key = parsed
+    found = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return hmac.compare_digest(found, key)
+
+def needs_rehash(stored, iterations=ITERATIONS):
+    parsed = parse_hash(stored)
+    return parsed is None or parsed[0] != iterations
+
+def apply_log(users, f, offset=0):
+    # apply the complete lines of the log from offset on; returns the new offset
+    f.seek(offset)
+    for line in f:
+        if not line.endswith(b"\n"):
+            break   # still being written; read it next time
+        offset += len(line)
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if entry.get("update") and entry["user"] in users:
+            users[entry["user"]] = entry["password"]
+        else:
+            users.setdefault(entry["user"], entry["password"])
+    return offset
+
+def stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+class UserRegistry:
+    def __init__(self, path=USER_FILE, iterations=ITERATIONS, cache_seconds=CACHE_SECONDS):
+        self.path = path
+        self.iterations = iterations
+        self.cache_seconds = cache_seconds
+        self.verified = {}     # username -> (stored hash, token, expiry)
+        self.secret = secrets.token_bytes(32)
+        self.log = path + LOG_SUFFIX
+        self.lock = threading.Lock()
+        self.users = {}
+        self.snapshot = None   # stamp of users.json when it was read
+        self.offset = 0        # bytes of the log already applied
+        self.log_id = None
+
+    # --------- Reading ---------
+    def refresh(self):
+        with self.lock:
+            snapshot = stamp(self.path)
+            if snapshot != self.snapshot:
+                self.users = self.read_snapshot()
+                self.snapshot = snapshot
+                self.offset, self.log_id = 0, None
+            log = stamp(self.log)
+            if log is None:
+                return
+            if log[2] != self.log_id or log[1] < self.offset:
+                # a new log: everything read so far from the old one is in the snapshot
+                if self.log_id is not None:
+                    self.users = self.read_snapshot()
+                self.offset, self.log_id = 0, log[2]
+            if log[1] > self.offset:
+                self.read_log()
+
+    def read_snapshot(self):
+        try:
+            with open(self.path, "r") as f:
+                users = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return users if isinstance(users, dict) else {}
+
+    def read_log(self):
+        with open(self.log, "rb") as f:
+            self.offset = apply_log(self.users, f, self.offset)
+
+    # --------- Queries ---------
+    def __contains__(self, username):
+        self.refresh()
+        return username in self.users
+
+    def names(self):
+        self.refresh()
+        return list(self.users)
+
+    def token(self, username, password):
+        # what the cache keeps instead of the password itself
+        return hmac.new(self.secret, f"{username}\0{password}".encode("utf-8"), hashlib.sha256).digest()
+
+    def check(self, username, password):
+        self.refresh()
+        stored = self.users.get(username)
+        if stored is None:
+            hash_password(password, self.iterations)   # same cost whether or not the name exists
+            return False
+        token = self.token(username, password)
+        cached = self.verified.get(username)
+        if cached and cached[0] == stored and hmac.compare_digest(cached[1], token) and cached[2] > time.monotonic():
+            return True
+        if not verify_password(stored, password):
+            return False
+        if needs_rehash(stored, self.iterations):
+            plaintext = parse_hash(stored) is None
+            stored = hash_password(password, self.iterations)
+            self.write({"user": username, "password": stored, "update": True})
+            if plaintext:
+                self.compact()   # so the plaintext leaves users.json now
+            self.refresh()
+            stored = self.users.get(username)
+        self.verified[username] = (stored, token, time.monotonic() + self.cache_seconds)
+        return True
+
+    def forget(self, username=None):
+        # drop cached verifications (all of them without a name)
+        if username is None:
+            self.verified.clear()
+        else:
+            self.verified.pop(username, None)
+
+    # --------- Signup ---------
+    def add(self, username, password):
+        # False if the name is taken (including by a concurrent signup)
+        self.refresh()
+        if username in self.users:
+            return False
+        stored = hash_password(password, self.iterations)
+        self.write({"user": username, "password": stored})
+        self.refresh()
+        return self.users.get(username) == stored
+
+    def write(self, entry):
+        line = json.dumps(entry) + "\n"
+        with self.lock, journal.locked(self.path):
+            fd = os.open(self.log, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, line.encode("utf-8"))
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            if size >= journal.COMPACT_BYTES:
+                self.compact()
+
+    # --------- Compaction ---------
+    def compact(self):
+        # fold the log into users.json
+        with journal.locked(self.path):
+            if os.path.exists(self.log):
+                self.replace(self.fold())
+
+    def hash_plaintext(self):
+        # hash every password still stored in plaintext and rewrite
+        # users.json (log folded in) so none is left on disk; returns how
+        # many were hashed
+        with journal.locked(self.path):
+            users = self.fold()
+            plain = [name for name, stored in users.items() if parse_hash(stored) is None]
+            for name in plain:
+                users[name] = hash_password(users[name], self.iterations)
+            if plain:
+                self.replace(users)
+        return len(plain)
+
+    def fold(self):
+        # users.json with the log applied; call with the file lock held
+        users = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                users = json.load(f)   # a corrupt file raises rather than losing every account
+        if os.path.exists(self.log):
+            with open(self.log, "rb") as f:
+                apply_log(users, f)
+        return users
+
+    def replace(self, users):
+        # the new users.json goes in before the log goes away, so a reader in
+        # between sees the log over a snapshot that already has it: no change
+        tmp = journal.write_tmp(self.path, users)
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, self.path)
+        if os.path.exists(self.log):
+            os.remove(self.log)
@@ -0,0 +1,191 @@
+import tkinter as tk
+from bisect import bisect_left
+from tkinter import ttk
+
+# A ttk.Treeview that only holds Tk items for the rows in view (plus a few
+# rows of overscan). The rows themselves stay in a Python list; scrolling
+# just rewrites the values of a fixed set of slot items. Anything not
+# overridden here (heading, column, pack, bind...) goes to the real Treeview.
+
+DEFAULT_ROW_HEIGHT = 20
+
+class VirtualTree:
+    def __init__(self, master, scrollbar, format_row, overscan=5, tree=None, **kw):
+        # tree: an existing Treeview (or stand-in) to drive instead of a new one
+        self.tree = tree if tree is not None else ttk.Treeview(master, **kw)
+        self.scrollbar = scrollbar
+        self.format_row = format_row
+        self.overscan = overscan
+        self.rows = []          # (iid, contact) pairs, iid being the record id
+        self.top = 0            # index of the first row in view
+        self.visible = 20       # rows that fit in the viewport
+        self.slots = []         # Tk item ids currently in the tree
+        self.slot_values = []   # values last written to each slot
+        self.slot_rows = {}     # slot item -> record iid
+        self.start = 0          # index of the row shown in slots[0]
+        self.selected = {}      # record iids -> None, in the order picked; includes rows scrolled out of view
+
+        scrollbar.config(command=self.yview)
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Up>", lambda e: self.on_key(-1))
+        self.tree.bind("<Down>", lambda e: self.on_key(1))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible))
+        self.tree.bind("<<TreeviewSelect>>", self.on_select, add="+")
+
+    def __getattr__(self, name):
+        return getattr(self.tree, name)
+
+    # --------- Data ---------
+    def set_rows(self, rows):
+        self.rows = rows if hasattr(rows, "__getitem__") else list(rows)   # lists or RowLists
+        if self.selected:
+            present = {iid for iid, _ in self.rows}
+            self.selected = {iid: None for iid in self.selected if iid in present}
+        self.top = max(0, min(self.top, len(self.rows) - self.visible))
+        self.render()
+
+    def append_rows(self, rows):
+        # rows that come after the current ones (a book still loading)
+        self.rows.extend(rows)
+        self.render()
+
+    def patch_rows(self, removed, rows):
+        # a few rows changed: drop the `removed` iids and put each of `rows`
+        # ({iid: contact}) in its place. Rows are kept in book order, which
+        # is iid order, so each one is found by bisection; rows going in or
+        # out above the viewport move it with them so the view holds still.
+        def find(iid):
+            i = bisect_left(self.rows, int(iid), key=lambda r: int(r[0]))
+            return i, i < len(self.rows) and self.rows[i][0] == iid
+
+        for iid in removed:
+            i, found = find(iid)
+            if found:
+                del self.rows[i]
+                self.selected.pop(iid, None)
+                if i < self.top:
+                    self.top -= 1
+        for iid in sorted(rows, key=int):
+            i, found = find(iid)
+            if found:
+                self.rows[i] = (iid, rows[iid])
+            else:
+                self.rows.insert(i, (iid, rows[iid]))
+                if i < self.top:
+                    self.top += 1
+        self.clamp()
+        self.render()
+
+    def selection(self):
+        return tuple(self.selected)
+
+    # --------- Scrolling ---------
+    def yview(self, *args):
+        if not args:
+            return self.fractions()
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            step = self.visible if args[2] == "pages" else 1
+            self.top += int(args[1]) * step
+        self.clamp()
+        self.render()
+
+    def scroll(self, rows):
+        self.top += rows
+        self.clamp()
+        self.render()
+        return "break"
+
+    def on_wheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def on_key(self, step):
+        focus = self.slot_rows.get(self.tree.focus())
+        index = self.row_index(focus)
+        if index is None:
+            return None
+        target = index + step
+        if not 0 <= target < len(self.rows):
+            return "break"
+        if target < self.top or target >= self.top + self.visible:
+            self.top += step
+            self.clamp()
+        iid = self.rows[target][0]
+        self.selected = {iid: None}
+        self.render()
+        for slot, rid in self.slot_rows.items():
+            if rid == iid:
+                self.tree.focus(slot)
+        return "break"
+
+    def row_index(self, iid):
+        if iid is None:
+            return None
+        for i in range(self.start, min(self.start + len(self.slots), len(self.rows))):
+            if self.rows[i][0] == iid:
+                return i
+        return None
+
+    def clamp(self):
+        self.top = max(0, min(self.top, len(self.rows) - self.visible))
+
+    def fractions(self):
+        if not self.rows:
+            return (0.0, 1.0)
+        n = len(self.rows)
+        return (self.top / n, min(1.0, (self.top + self.visible) / n))
+
+    def on_resize(self, event):
+        try:
+            row_height = int(ttk.Style().lookup("Treeview", "rowheight") or DEFAULT_ROW_HEIGHT)
+        except (tk.TclError, ValueError):
+            row_height = DEFAULT_ROW_HEIGHT
+        # one row's worth of height goes to the headings
+        visible = max(1, event.height // row_height - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.clamp()
+            self.render()
+
+    # --------- Rendering ---------
+    def on_select(self, event=None):
+        in_view = set(self.slot_rows.values())
+        picked = [self.slot_rows[s] for s in self.tree.selection() if s in self.slot_rows]
+        # rows still picked keep their place; newly picked ones follow in the Treeview's order
+        selected = {iid: None for iid in self.selected if iid not in in_view or iid in picked}
+        selected.update(dict.fromkeys(picked))
+        self.selected = selected
+
+    def render(self):
+        self.start = max(0, self.top - self.overscan)
+        window = self.rows[self.start:self.top + self.visible + self.overscan]
+
+        while len(self.slots) < len(window):
+            self.slots.append(self.tree.insert("", "end", values=()))
+            self.slot_values.append(None)
+        if len(self.slots) > len(window):
+            self.tree.delete(*self.slots[len(window):])
+            del self.slots[len(window):]
+            del self.slot_values[len(window):]
+
+        self.slot_rows = {}
+        keep = []
+        for n, (slot, (iid, contact)) in enumerate(zip(self.slots, window)):
+            values = self.format_row(contact)
+            if self.slot_values[n] != values:
+                self.tree.item(slot, values=values)
+                self.slot_values[n] = values
+            self.slot_rows[slot] = iid
+            if iid in self.selected:
+                keep.append(slot)
+        self.tree.selection_set(keep)
+
+        self.tree.yview_moveto(0)
+        if self.top > self.start:
+            self.tree.yview_scroll(self.top - self.start, "units")
+        self.scrollbar.set(*self.fractions())
@@ -1,20 +1,17 @@
 import tkinter as tk
 from tkinter import messagebox, ttk, simpledialog
-import json, os
+from contact_store import ContactStore
 
 FILE = "contacts.json"
+store = ContactStore(FILE, storage="json", sort_by_name=True)
 
 # Load contacts
 def load_contacts():
-    if os.path.exists(FILE):
-        with open(FILE, "r") as f:
-            return json.load(f)
-    return []
+    return store.load()
 
 # Save contacts
 def save_contacts():
-    with open(FILE, "w") as f:
-        json.dump(contacts, f, indent=4)
+    store.save()
 
 def add_contact():
     name = name_var.get().strip()
@@ -22,16 +19,10 @@ def add_contact():
     email = email_var.get().strip()
 
     if name and phone:
-        contact = {
-            "name": name,
-            "phone": phone,
-            "email": email,
-            "favourite": False,
-            "blocked": False
-        }
-        contacts.append(contact)
-        contacts.sort(key=lambda x: x['name'].lower())
-        save_contacts()
+        if store.has_phone(phone):
+            messagebox.showwarning("Duplicate", "A contact with this phone already exists.")
+            return
+        store.add(name, phone, email)
         refresh_table()
         clear_fields()
     else:
@@ -48,59 +39,45 @@ def delete_contact():
         messagebox.showinfo("Select", "Select contact(s) to delete.")
         return
 
-    for item in selected_items:
-        idx = tree.index(item)
-        contacts.pop(idx)
-    save_contacts()
+    store.delete(selected_items)
     refresh_table()
 
 def edit_contact():
     selected = tree.selection()
     if selected:
-        idx = tree.index(selected[0])
-        contact = contacts[idx]
+        contact = store.get(selected[0])
 
-        new_name = simpledialog.askstring("Edit Name", "Name:", initialvalue=contact["name"])
-        new_phone = simpledialog.askstring("Edit Phone", "Phone:", initialvalue=contact["phone"])
-        new_email = simpledialog.askstring("Edit Email", "Email:", initialvalue=contact["email"])
+        new_name = simpledialog.askstring("Edit Name", "Name:", initialvalue=contact.name)
+        new_phone = simpledialog.askstring("Edit Phone", "Phone:", initialvalue=contact.phone)
+        new_email = simpledialog.askstring("Edit Email", "Email:", initialvalue=contact.email)
 
         if new_name and new_phone:
-            contacts[idx] = {
-                "name": new_name,
-                "phone": new_phone,
-                "email": new_email or "",
-                "favourite": contact.get("favourite", False),
-                "blocked": contact.get("blocked", False)
-            }
-            contacts.sort(key=lambda x: x['name'].lower())
-            save_contacts()
+            if new_phone != contact.phone and store.has_phone(new_phone):
+                messagebox.showwarning("Duplicate", "A contact with this phone already exists.")
+                return
+            store.edit(selected[0], new_name, new_phone, new_email or "")
             refresh_table()
         else:
             messagebox.showwarning("Required", "Name and Phone can't be empty.")
 
+def status_text(contact):
+    return "⭐" if contact.status == "favourite" else "🚫" if contact.status == "blocked" else "Normal"
+
 def refresh_table(filtered=None):
     tree.delete(*tree.get_children())
-    data = filtered if filtered is not None else contacts
-    for contact in data:
-        status = "⭐" if contact.get("favourite") else "🚫" if contact.get("blocked") else "Normal"
-        tree.insert("", tk.END, values=(contact["name"], contact["phone"], contact["email"], status))
+    data = filtered if filtered is not None else store.items()
+    for iid, contact in data:
+        tree.insert("", tk.END, iid=iid, values=(contact.name, contact.phone, contact.email, status_text(contact)))
 
 def search_contact(event=None):
+    # by name only, as this window always has
     keyword = search_var.get().lower()
-    tree.delete(*tree.get_children())
-    for contact in contacts:
-        if keyword in contact["name"].lower():
-            status = "⭐" if contact.get("favourite") else "🚫" if contact.get("blocked") else "Normal"
-            tree.insert("", tk.END, values=(contact["name"], contact["phone"], contact["email"], status))
+    refresh_table([(iid, c) for iid, c in store.items() if keyword in c.name.lower()])
 
 def toggle_favourite():
     selected = tree.selection()
     if selected:
-        idx = tree.index(selected[0])
-        contacts[idx]["favourite"] = not contacts[idx].get("favourite", False)
-        if contacts[idx]["favourite"]:
-            contacts[idx]["blocked"] = False
-        save_contacts()
+        store.toggle_status(selected[:1], "favourite")
         refresh_table()
     else:
         messagebox.showinfo("Select", "Select a contact to favourite/unfavourite.")
@@ -108,24 +85,20 @@ def toggle_favourite():
 def toggle_blocked():
     selected = tree.selection()
     if selected:
-        idx = tree.index(selected[0])
-        contacts[idx]["blocked"] = not contacts[idx].get("blocked", False)
-        if contacts[idx]["blocked"]:
-            contacts[idx]["favourite"] = False
-        save_contacts()
+        store.toggle_status(selected[:1], "blocked")
         refresh_table()
     else:
         messagebox.showinfo("Select", "Select a contact to block/unblock.")
 
 def show_favourites():
-    favs = [c for c in contacts if c.get("favourite")]
+    favs = store.filter("favourite")
     if favs:
         refresh_table(filtered=favs)
     else:
         messagebox.showinfo("Favourites", "No favourite contacts yet.")
 
 def show_blocked():
-    blocked = [c for c in contacts if c.get("blocked")]
+    blocked = store.filter("blocked")
     if blocked:
         refresh_table(filtered=blocked)
     else:
@@ -133,7 +106,7 @@ def show_blocked():
 
 # ------------------- GUI MAIN WINDOW -------------------
 def show_contact_book():
-    global root, name_var, phone_var, email_var, search_var, tree, contacts
+    global root, name_var, phone_var, email_var, search_var, tree
 
     root = tk.Tk()
     root.title("Contact Book")
@@ -211,7 +184,7 @@ def show_contact_book():
     tk.Button(btn_frame, text="⭐ Favourite", bg="#2196F3", fg="white", width=20, command=toggle_favourite).grid(row=1, column=0, pady=5)
     tk.Button(btn_frame, text="🚫 Block", bg="#9C27B0", fg="white", width=20, command=toggle_blocked).grid(row=1, column=1, pady=5)
 
-    contacts = load_contacts()
+    load_contacts()
     refresh_table()
 
     search_var.trace_add("write", lambda *args: search_contact())
@@ -0,0 +1,89 @@
+import threading, time
+
+# Write-behind persistence for a ContactStore. Changes land in memory at
+# once and their ops are queued here; a background thread waits DELAY for
+# a burst of changes to settle, then hands everything queued to
+# store.write_out() as one write (one log append, or one rewrite of the
+# JSON file). flush() writes whatever is still queued on the calling
+# thread, and close() flushes and stops the thread; the apps call it on
+# Exit so nothing queued is lost. A close() whose flush fails raises and
+# leaves the writer running with its queue intact.
+#
+# Lock order is drain lock, then store.mem_lock, then the book's file lock.
+
+DELAY = 0.05     # seconds to let changes pile up before writing
+RETRY = 1.0      # seconds before retrying a failed write
+
+class WriteBehind:
+    def __init__(self, store, delay=DELAY):
+        self.store = store
+        self.delay = delay
+        self.ops = []
+        self.error = None
+        self.cond = threading.Condition()
+        self.drain_lock = threading.Lock()
+        self.start()
+
+    def start(self):
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # --------- Queue ---------
+    def push(self, ops):
+        with self.cond:
+            self.ops.extend(ops)
+            self.cond.notify_all()
+
+    def queued(self):
+        with self.cond:
+            return list(self.ops)
+
+    def take(self):
+        # ops stay queued (and replayed by store.reload) until done() says they are on disk
+        with self.cond:
+            return list(self.ops)
+
+    def done(self, ops):
+        with self.cond:
+            del self.ops[:len(ops)]
+
+    # --------- Writing ---------
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.ops and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+            time.sleep(self.delay)
+            if not self.drain():
+                time.sleep(RETRY)
+
+    def drain(self):
+        with self.drain_lock:
+            try:
+                self.store.write_out(self)
+                self.error = None
+                return True
+            except OSError as e:
+                self.error = e
+                return False
+
+    def flush(self):
+        # write everything queued now; raises the last error if some could not be written
+        while self.queued():
+            if not self.drain():
+                raise self.error
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
+        try:
+            self.flush()
+        except OSError:
+            # keep the queue, and keep retrying it in the background
+            self.start()
+            raise